@@ -0,0 +1,110 @@
+"""
+Frame rate of the background crossfade.
+
+Compares the per frame cost of the previous crossfade (fill and two alpha blits),
+a NumPy lerp into a reused buffer and the keyframes of DynamicBackground, and counts
+how many full screen redraws one cover change costs.
+
+Run from the repository root:
+
+    python benchmarks/crossfade.py [width] [height]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pygame  # noqa: E402
+
+from mopidy_touchscreen.graphic_utils import DynamicBackground  # noqa: E402
+from mopidy_touchscreen.scheduler import scheduler  # noqa: E402
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+frames = 300
+
+
+def noise_surface(size, seed):
+    surface = pygame.Surface(size).convert()
+    for y in range(0, size[1], 8):
+        for x in range(0, size[0], 8):
+            surface.fill(((x * seed) % 256, (y * seed) % 256, (x + y) % 256), (x, y, 8, 8))
+    return surface
+
+
+def report(name, count, elapsed, redraws=None):
+    line = f'{name:24} {count / elapsed:8.0f} frames/s'
+    if redraws is not None:
+        line += f', {redraws} redraws per cover change'
+    print(line)
+
+
+def previous(last, image, surface):
+    start = time.perf_counter()
+    for frame in range(frames):
+        percent = frame * 5 % 255
+        surface.fill((0, 0, 0))
+        last.set_alpha(255 - percent)
+        image.set_alpha(percent)
+        surface.blit(last, (0, 0))
+        surface.blit(image, (0, 0))
+    report('fill and two blits', frames, time.perf_counter() - start, 255 // 5)
+    last.set_alpha(None)
+    image.set_alpha(None)
+
+
+def lerp(last, image, surface):
+    base = pygame.surfarray.array3d(last).astype(numpy.int16)
+    difference = pygame.surfarray.array3d(image).astype(numpy.int16) - base
+    buffer = numpy.empty_like(base)
+    start = time.perf_counter()
+    for frame in range(frames):
+        numpy.multiply(difference, frame % 256, out=buffer)
+        numpy.right_shift(buffer, 8, out=buffer)
+        numpy.add(buffer, base, out=buffer)
+        pygame.surfarray.blit_array(surface, buffer)
+    report('numpy lerp', frames, time.perf_counter() - start)
+
+
+def keyframes(size, image):
+    background = DynamicBackground(size)
+    redraws = 0
+    per_change = 0
+    drawn = 0
+    elapsed = 0
+    for frame in range(frames):
+        if not background.is_fading():
+            per_change = max(per_change, redraws)
+            redraws = 0
+            background.set_background_image(image)
+            scheduler.now = 0
+        scheduler.now += background.crossfade_duration / background.crossfade_keyframes
+        if background.should_update():
+            start = time.perf_counter()
+            background.update_background()
+            elapsed += time.perf_counter() - start
+            redraws += 1
+            drawn += 1
+    report('keyframes', drawn, elapsed, per_change)
+
+
+def main():
+    size = (int(sys.argv[1]), int(sys.argv[2])) if len(sys.argv) > 2 else (320, 240)
+    pygame.init()
+    surface = pygame.display.set_mode(size)
+    last = noise_surface(size, 3)
+    image = noise_surface(size, 7)
+    previous(last, image, surface)
+    if numpy is not None:
+        lerp(last, image, surface)
+    keyframes(size, image)
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Import time of the extension.
+
+Imports the package and the frontend the way Mopidy does when it registers the
+extension, in a fresh interpreter with -X importtime, and lists the slowest imports.
+musicbrainzngs should not show up, it is imported with the first cover it has to find.
+pkg_resources is only there if the installed Mopidy imports it itself (Mopidy 3 does).
+
+Run from the repository root:
+
+    python benchmarks/import_time.py [count]
+"""
+import os
+import subprocess
+import sys
+
+root = os.path.join(os.path.dirname(__file__), '..')
+code = 'import mopidy_touchscreen; from mopidy_touchscreen.actor import TouchScreen'
+watched = ('pkg_resources', 'musicbrainzngs', 'mopidy', 'pygame')
+
+
+def import_times():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, (os.path.abspath(root), env.get('PYTHONPATH'))))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env, stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    if result.returncode != 0:
+        sys.exit('\n'.join(line for line in result.stderr.splitlines() if not line.startswith('import time:')))
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times.append((int(own), int(cumulative), name.rstrip()))
+    return times
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    times = import_times()
+    # Top level imports are not indented, their cumulative times add up to the total
+    total = sum(cumulative for own, cumulative, name in times if not name.startswith('  '))
+    print(f'{len(times)} modules imported in {total / 1000:.0f} ms')
+    for own, cumulative, name in sorted(times, key=lambda t: t[0], reverse=True)[:count]:
+        print(f'{own / 1000:8.1f} ms {cumulative / 1000:8.1f} ms cumulative  {name.strip()}')
+    for module in watched:
+        found = [cumulative for own, cumulative, name in times if name.strip() == module]
+        if len(found) > 0:
+            print(f'{module:16} {found[0] / 1000:8.1f} ms')
+        else:
+            print(f'{module:16} not imported')
+
+
+if __name__ == '__main__':
+    main()
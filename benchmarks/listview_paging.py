@@ -0,0 +1,55 @@
+"""
+Allocation benchmark for paging through a large ListView.
+
+Run from the repository root:
+
+    python benchmarks/listview_paging.py [items] [pages]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pygame  # noqa: E402
+
+from mopidy_touchscreen.graphic_utils import ListView  # noqa: E402
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    pygame.init()
+    surface = pygame.display.set_mode((320, 240))
+    font = pygame.font.Font(None, 27)
+    list_view = ListView((0, 0), (320, 210), 30, font)
+    list_view.set_list(['Track number %d with a name long enough to scroll' % i for i in range(items)])
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    blocks = 0
+    for page in range(pages):
+        before = tracemalloc.take_snapshot() if page == 0 else None
+        list_view.move_to(1 if (page // 50) % 2 == 0 else -1)
+        list_view.render(surface, True, [])
+        if before is not None:
+            stats = tracemalloc.take_snapshot().compare_to(before, 'lineno')
+            blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rows = list(list_view.screen_objects.touch_objects.values())
+    row = rows[-1]
+    row_size = sys.getsizeof(row) + (sys.getsizeof(row.__dict__) if hasattr(row, '__dict__') else 0)
+    print(f'{pages} page flips over {items} items: {pages / elapsed:.0f} pages/s')
+    print(f'python heap: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB')
+    print(f'allocated blocks per page flip: {blocks}')
+    print(f'row widget object size: {row_size} bytes')
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
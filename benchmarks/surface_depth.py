@@ -0,0 +1,88 @@
+"""
+Frame rate and memory of the internal pixel formats.
+
+Composes full frames the way ScreenManager does (background, a list of text rows and the
+translucent down bar) with the display format and with surface_depth = 16. The frames are
+presented to the display and, if NumPy is installed, to a file standing in for a 16 bit
+framebuffer. Memory counts the background, the back buffer and the cached frames.
+
+Run from the repository root:
+
+    python benchmarks/surface_depth.py [width] [height]
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pygame  # noqa: E402
+
+from mopidy_touchscreen import graphic_utils  # noqa: E402
+from mopidy_touchscreen.graphic_utils import DynamicBackground, ListView, StaticLayer, new_surface  # noqa: E402
+from mopidy_touchscreen.output import DisplayOutput, FramebufferOutput, numpy  # noqa: E402
+
+frames = 300
+cached_frames = 3
+
+
+def surface_bytes(surfaces):
+    return sum(surface.get_height() * surface.get_pitch() for surface in surfaces)
+
+
+def compose(size, output):
+    background = DynamicBackground(size)
+    cover = pygame.Surface((200, 200)).convert()
+    cover.fill((40, 90, 160))
+    background.set_background_image(background.prepare_image(cover))
+    background.set_crossfade(0, 1)
+    back_buffer = new_surface(size)
+    cache = [new_surface(size) for i in range(cached_frames)]
+    font = pygame.font.Font(None, size[1] // 9)
+    list_view = ListView((0, 0), (size[0], size[1] - size[1] // 8), size[1] // 8, font)
+    list_view.set_list(['Track number %d' % i for i in range(50)])
+    down_bar = StaticLayer((0, size[1] - size[1] // 8), (size[0], size[1] // 8), (0, 0, 0, 200))
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        background.draw_background(back_buffer)
+        list_view.render(back_buffer, True, [])
+        down_bar.render(back_buffer)
+        output.present(back_buffer, None)
+    elapsed = time.perf_counter() - start
+    memory = surface_bytes([background.surface, background.surface_image, background.surface_image_last,
+                            back_buffer] + cache)
+    return frames / elapsed, memory
+
+
+def main():
+    size = (int(sys.argv[1]), int(sys.argv[2])) if len(sys.argv) > 2 else (480, 320)
+    pygame.init()
+    pygame.display.set_mode(size)
+    framebuffer = None
+    if numpy is not None:
+        handle, framebuffer = tempfile.mkstemp()
+        os.write(handle, bytes(size[0] * size[1] * 2))
+        os.close(handle)
+    try:
+        for depth in (0, 16):
+            graphic_utils.set_surface_depth(depth)
+            name = 'display format' if depth == 0 else '16 bit'
+            fps, memory = compose(size, DisplayOutput())
+            print(f'{name:16} display     {fps:6.0f} frames/s, {memory / 1024 / 1024:5.1f} MiB')
+            if framebuffer is not None:
+                output = FramebufferOutput(framebuffer, size)
+                fps, memory = compose(size, output)
+                output.close()
+                print(f'{name:16} framebuffer {fps:6.0f} frames/s')
+    finally:
+        graphic_utils.set_surface_depth(0)
+        if framebuffer is not None:
+            os.remove(framebuffer)
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
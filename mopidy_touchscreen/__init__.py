@@ -22,10 +22,16 @@ class Extension(ext.Extension):
         schema['cursor'] = config.Boolean()
         schema['fullscreen'] = config.Boolean()
         schema['cache_dir'] = config.Path()
+        schema['crossfade_duration'] = config.Integer(minimum=0)
+        schema['crossfade_keyframes'] = config.Integer(minimum=1)
+        schema['screen_cache_size'] = config.Integer(minimum=0)
+        schema['surface_depth'] = config.Integer(choices=[0, 16])
+        schema['render_scale'] = config.Integer(minimum=0, maximum=100)
         schema['sdl_videodriver'] = config.String()
         schema['sdl_video_render_driver'] = config.String()
         schema['sdl_video_device_index'] = config.String()
         schema['sdl_video_device'] = config.String()
+        schema['framebuffer_device'] = config.String()
         schema['sdl_mousedriver'] = config.String()
         schema['sdl_mousedev'] = config.String()
         schema['sdl_audiodriver'] = config.String()
@@ -10,14 +10,18 @@ import pygame
 import pykka
 from mopidy import core, exceptions
 
-from .screen_manager import ScreenManager, Screen, ScreenNames
+from .graphic_utils import set_surface_depth
+from .output import DisplayOutput, FramebufferOutput
+from .scheduler import scheduler
+from .screen_manager import ScreenManager, Screen, ScreenNames, show_splash
 
 logger = logging.getLogger(__name__)
 
 class MPDEvent:
     Type = Enum("Type",
             "Track_Playback_Started Track_Playback_Ended Playback_State_Changed "
-            "Volume_Changed Tracklist_Changed Options_Changed Playlists_Loaded Stream_Title_Changed")
+            "Volume_Changed Tracklist_Changed Options_Changed Playlists_Loaded Playlist_Changed Playlist_Deleted "
+            "Stream_Title_Changed")
 
     def __init__(self, evtype, data):
         self.evtype = evtype
@@ -35,7 +39,12 @@ class TouchScreen(pykka.ThreadingActor, core.CoreListener):
         self.core = core
         self.running = False
         self.screen = None
+        self.output = None
         self.screen_manager = None
+        # Resizing a window sends a burst of events, only the last size is laid out
+        self.resize_delay = 0.2  # seconds
+        self.resize_size = None
+        self.resize_timer = None
 
         cfg = config['touchscreen']
         self.cursor = cfg.get('cursor')
@@ -43,6 +52,12 @@ class TouchScreen(pykka.ThreadingActor, core.CoreListener):
         self.fullscreen = cfg.get('fullscreen')
         self.screen_size = (cfg.get('screen_width'), cfg.get('screen_height'))
         self.resolution_factor = cfg.get('resolution_factor')
+        self.crossfade_duration = cfg.get('crossfade_duration') / 1000  # seconds
+        self.crossfade_keyframes = cfg.get('crossfade_keyframes')
+        self.screen_cache_size = cfg.get('screen_cache_size')
+        self.render_scale = cfg.get('render_scale')
+        self.framebuffer_device = cfg.get('framebuffer_device')
+        self.surface_depth = cfg.get('surface_depth')
 
         self.start_screen = ScreenNames.get(cfg.get('start_screen'))
         if self.start_screen is None:
@@ -99,23 +114,40 @@ class TouchScreen(pykka.ThreadingActor, core.CoreListener):
         except Exception:
             raise exceptions.FrontendError("Error on display init:\n" + traceback.format_exc())
 
+    def get_output(self):
+        if self.framebuffer_device != "none":
+            try:
+                output = FramebufferOutput.open(self.framebuffer_device, self.screen_size)
+                logger.info(f'writing frames to {self.framebuffer_device}')
+                return output
+            except Exception as e:
+                logger.error(f'framebuffer_device {self.framebuffer_device} can not be used, '
+                             f'falling back to the SDL display: {e}')
+        return DisplayOutput()
+
     def start_thread(self):
         pygame.init()
         logger.info(f"Pygame {pygame.version.ver} SDL {pygame.version.SDL}")
         pygame.display.set_caption("Mopidy-Touchscreen")
         self.get_display_surface(self.screen_size)
         pygame.mouse.set_visible(self.cursor)
+        self.output = self.get_output()
+        set_surface_depth(self.surface_depth)
+        show_splash(self.output, self.cache_dir, self.screen_size)
 
         self.screen_manager = ScreenManager(self.screen_size, self.core, self.cache_dir, self.resolution_factor,
                                             self.start_screen, self.main_screen)
 
         self.screen_manager.set_inactivity_timeout(self.inactivity_timeout)
+        self.screen_manager.set_crossfade(self.crossfade_duration, self.crossfade_keyframes)
+        self.screen_manager.set_screen_cache_size(self.screen_cache_size)
+        self.screen_manager.set_render_scale(self.render_scale)
 
         logger.info("starting event handling loop")
-        clock = pygame.time.Clock()
         pygame.event.set_blocked(pygame.MOUSEMOTION)
+        events = []
         while self.running:
-            clock.tick(12)
+            scheduler.tick()
 
             while len(self.mpdqueue) > 0:
                 mpd_ev = self.mpdqueue.popleft()
@@ -135,25 +167,42 @@ class TouchScreen(pykka.ThreadingActor, core.CoreListener):
                         self.screen_manager.options_changed()
                     elif mpd_ev.evtype == MPDEvent.Type.Playlists_Loaded:
                         self.screen_manager.playlists_loaded()
+                    elif mpd_ev.evtype == MPDEvent.Type.Playlist_Changed:
+                        self.screen_manager.playlist_changed(mpd_ev.data)
+                    elif mpd_ev.evtype == MPDEvent.Type.Playlist_Deleted:
+                        self.screen_manager.playlist_deleted(mpd_ev.data)
                     elif mpd_ev.evtype == MPDEvent.Type.Stream_Title_Changed:
                         self.screen_manager.stream_title_changed(mpd_ev.data)
                 except:
                     traceback.print_exc()
 
-            if self.screen is not None:
-                self.screen_manager.update(self.screen)
-
-            for event in pygame.event.get():
+            # Input is handled before drawing, so its effect is shown in the same frame
+            for event in events:
                 # logger.info(f"got event {event}")
                 if event.type == pygame.QUIT:
                     os.system("pkill mopidy")
                 elif event.type == pygame.VIDEORESIZE:
-                    self.get_display_surface(event.size)
-                    self.screen_manager.resize(event)
+                    self.resize_size = event.size
+                    if self.resize_timer is not None:
+                        self.resize_timer.cancel()
+                    self.resize_timer = scheduler.call_later(self.resize_delay, self.resize)
                 else:
                     self.screen_manager.event(event)
+
+            if self.screen is not None:
+                self.screen_manager.update(self.output)
+
+            # Sleep until something has to be drawn or an event arrives
+            events = scheduler.wait()
+        self.screen_manager.save_splash(wait=True)
+        self.output.close()
         pygame.quit()
 
+    def resize(self):
+        self.resize_timer = None
+        self.get_display_surface(self.resize_size)
+        self.screen_manager.resize(self.resize_size)
+
     def on_start(self):
         logger.info("Attempting to start TouchScreen")
         try:
@@ -166,29 +215,38 @@ class TouchScreen(pykka.ThreadingActor, core.CoreListener):
 
     def on_stop(self):
         self.running = False
+        scheduler.wake()
+
+    def queue_event(self, evtype, data):
+        self.mpdqueue.append(MPDEvent(evtype, data))
+        scheduler.wake()
 
     def track_playback_started(self, tl_track):
-        self.mpdqueue.append(MPDEvent(MPDEvent.Type.Track_Playback_Started, tl_track))
+        self.queue_event(MPDEvent.Type.Track_Playback_Started, tl_track)
 
     def track_playback_ended(self, tl_track, time_position):
-        self.mpdqueue.append(MPDEvent(MPDEvent.Type.Track_Playback_Ended,
-                                      {"tl_track": tl_track, "time_position": time_position}))
+        self.queue_event(MPDEvent.Type.Track_Playback_Ended, {"tl_track": tl_track, "time_position": time_position})
 
     def volume_changed(self, volume):
-        self.mpdqueue.append(MPDEvent(MPDEvent.Type.Volume_Changed, volume))
+        self.queue_event(MPDEvent.Type.Volume_Changed, volume)
 
     def playback_state_changed(self, old_state, new_state):
-        self.mpdqueue.append(MPDEvent(MPDEvent.Type.Playback_State_Changed,
-                                      {"old_state": old_state, "new_state": new_state}))
+        self.queue_event(MPDEvent.Type.Playback_State_Changed, {"old_state": old_state, "new_state": new_state})
 
     def tracklist_changed(self):
-        self.mpdqueue.append(MPDEvent(MPDEvent.Type.Tracklist_Changed, None))
+        self.queue_event(MPDEvent.Type.Tracklist_Changed, None)
 
     def options_changed(self):
-        self.mpdqueue.append(MPDEvent(MPDEvent.Type.Options_Changed, None))
+        self.queue_event(MPDEvent.Type.Options_Changed, None)
 
     def playlists_loaded(self):
-        self.mpdqueue.append(MPDEvent(MPDEvent.Type.Playlists_Loaded, None))
+        self.queue_event(MPDEvent.Type.Playlists_Loaded, None)
+
+    def playlist_changed(self, playlist):
+        self.queue_event(MPDEvent.Type.Playlist_Changed, playlist)
+
+    def playlist_deleted(self, uri):
+        self.queue_event(MPDEvent.Type.Playlist_Deleted, uri)
 
     def stream_title_changed(self, title):
-        self.mpdqueue.append(MPDEvent(MPDEvent.Type.Stream_Title_Changed, title))
+        self.queue_event(MPDEvent.Type.Stream_Title_Changed, title)
@@ -1,62 +1,173 @@
 import pygame
 import logging
 import math
+import os
 
 from .input_manager import InputEvent
+from .scheduler import scheduler
 
 logger = logging.getLogger(__name__)
 
+# Bits per pixel of the opaque surfaces, 0 uses the format of the display. Surfaces with per pixel alpha stay 32 bit.
+surface_depth = 0
+
+
+def set_surface_depth(depth):
+    global surface_depth
+    surface_depth = depth
+
+
+# Opaque surface in the internal pixel format
+def new_surface(size):
+    if surface_depth == 0:
+        return pygame.Surface(size).convert()
+    return pygame.Surface(size, 0, surface_depth)
+
+
+def convert_surface(surface):
+    if surface_depth == 0:
+        return surface.convert()
+    return surface.convert(surface_depth)
+
+
 class DynamicBackground:
+    """
+    Blurred cover behind all screens. A new cover fades in over crossfade_duration seconds
+    in crossfade_keyframes steps, each step is one copy and one alpha blit into a reused surface.
+    """
+
+    crossfade_duration = 4.25
+    crossfade_keyframes = 16
+
     def __init__(self, size):
         self.image_loaded = False
         self.size = size
-        self.surface = pygame.Surface(self.size).convert()
+        self.surface = new_surface(self.size)
         self.surface.fill((145, 16, 16))
-        self.surface_image = pygame.Surface(self.size).convert()
+        self.surface_image = new_surface(self.size)
         self.surface_image.fill((145, 16, 16))
-        self.surface_image_last = pygame.Surface(self.size).convert()
+        self.surface_image_last = new_surface(self.size)
+        # the cover shown, see shrink_cover(), it is prepared again if the aspect ratio changes
+        self.cover = None
         self.update = True
-        self.screen_change_percent = 100
-
-    def draw_background(self):
+        self.screen_change_percent = 255
+        self.screen_change_start = None
+        self.next_keyframe = 0
+        # changes whenever the surface changes
+        self.generation = 0
+        self.crossfade_duration = DynamicBackground.crossfade_duration
+        self.crossfade_keyframes = DynamicBackground.crossfade_keyframes
+
+    # duration in seconds, 0 shows a new cover at once
+    def set_crossfade(self, duration, keyframes):
+        self.crossfade_duration = duration
+        self.crossfade_keyframes = max(keyframes, 1)
+
+    def draw_background(self, surface):
         self.update_background()
-        return self.surface.copy()
+        surface.blit(self.surface, (0, 0))
 
     def draw_background_in_rects(self, surface, rects):
         self.update_background()
         for rect in rects:
             surface.blit(self.surface, rect, area=rect)
 
+    def is_fading(self):
+        return self.image_loaded and self.screen_change_percent < 255
+
     def update_background(self):
-        if self.image_loaded:
-            if self.screen_change_percent < 255:
-                self.surface.fill((0, 0, 0))
-                self.surface_image_last.set_alpha(255 - self.screen_change_percent)
-                self.surface_image.set_alpha(self.screen_change_percent)
+        if self.is_fading():
+            # The fade starts with the first frame drawn after the cover was set
+            if self.screen_change_start is None:
+                self.screen_change_start = scheduler.now
+            if self.crossfade_duration > 0:
+                elapsed = scheduler.now - self.screen_change_start
+                keyframe = min(int(elapsed * self.crossfade_keyframes / self.crossfade_duration) + 1,
+                               self.crossfade_keyframes)
+            else:
+                keyframe = self.crossfade_keyframes
+            alpha = int(255 * keyframe / self.crossfade_keyframes)
+            if alpha != self.screen_change_percent:
+                self.screen_change_percent = alpha
+                self.generation += 1
                 self.surface.blit(self.surface_image_last, (0, 0))
+                if alpha < 255:
+                    self.surface_image.set_alpha(alpha)
+                else:
+                    self.surface_image.set_alpha(None)
                 self.surface.blit(self.surface_image, (0, 0))
-                self.screen_change_percent += 5
-                self.update = True
+            if self.is_fading():
+                self.next_keyframe = self.screen_change_start + \
+                    keyframe * self.crossfade_duration / self.crossfade_keyframes
+                scheduler.request_frame_at(self.next_keyframe)
 
     def should_update(self):
         if self.update:
             self.update = False
             return True
+        # Frames between two keyframes don't change the background
+        return self.is_fading() and (self.screen_change_start is None or scheduler.now >= self.next_keyframe)
+
+    # Scales what is shown and the fade to a new size, the blurred cover does not suffer from it.
+    # A new aspect ratio would stretch the cover, then it is prepared again and shown without the fade.
+    def resize(self, size):
+        aspect_changed = not same_aspect(self.size, size)
+        self.size = size
+        if aspect_changed and self.cover is not None:
+            self.surface_image = self.prepare_image(self.cover)
+            self.surface = self.surface_image.copy()
+            self.surface_image_last = new_surface(size)
+            self.screen_change_percent = 255
         else:
-            return False
+            self.surface = pygame.transform.scale(self.surface, size)
+            self.surface_image = pygame.transform.scale(self.surface_image, size)
+            self.surface_image_last = pygame.transform.scale(self.surface_image_last, size)
+        self.generation += 1
+        self.update = True
 
-    def set_background_image(self, image):
+    # A copy of a cover that is kept for resize(), it is blurred anyway so the screen size is plenty
+    def shrink_cover(self, image):
+        factor = max(self.size) / max(image.get_size())
+        if factor >= 1:
+            return image
+        return pygame.transform.smoothscale(image, (max(int(image.get_width() * factor), 1),
+                                                    max(int(image.get_height() * factor), 1)))
+
+    # Scales and blurs a cover for set_background_image. This is the slow part, it runs on the cover threads
+    def prepare_image(self, image):
+        image_size = get_aspect_scale_size(image, self.size)
+        target = pygame.transform.smoothscale(image, image_size)
+        prepared = new_surface(self.size)
+        pos = (int((self.size[0] - image_size[0]) / 2), (int(self.size[1] - image_size[1]) / 2))
+        prepared.blit(blur_surf_times(target, self.size[0] / 40, 10), pos)
+        return prepared
+
+    # image comes from prepare_image and cover from shrink_cover. This has to run on the UI thread
+    # as it changes the surfaces being drawn.
+    def set_background_image(self, image, cover=None):
         if image is not None:
-            image_size = get_aspect_scale_size(image, self.size)
-            target = pygame.transform.smoothscale(image, image_size)
-            self.surface_image_last = self.surface_image.copy()
-            pos = (int((self.size[0] - image_size[0]) / 2), (int(self.size[1] - image_size[1]) / 2))
-            self.surface_image.blit(blur_surf_times(target, self.size[0] / 40, 10), pos)
+            self.cover = cover
+            # The background was resized while the cover was prepared
+            if image.get_size() != self.size:
+                if cover is not None and not same_aspect(image.get_size(), self.size):
+                    image = self.prepare_image(cover)
+                else:
+                    image = pygame.transform.scale(image, self.size)
+            # Fade from what is shown, even if the last fade did not finish
+            self.surface_image_last.blit(self.surface, (0, 0))
+            self.surface_image.blit(image, (0, 0))
             self.screen_change_percent = 0
+            self.screen_change_start = None
             self.image_loaded = True
+        self.generation += 1
         self.update = True
 
 
+# Sizes that only differ by rounding, e.g. of the render scale
+def same_aspect(size, other):
+    return abs(size[0] * other[1] - size[1] * other[0]) <= 0.02 * size[0] * other[1]
+
+
 def get_aspect_scale_size(img, new_size):
     size = img.get_size()
     aspect_x = new_size[0] / float(size[0])
@@ -91,6 +202,9 @@ def blur_surf(surface, amt):
 
 
 class ListView:
+    # Rows that don't fit scroll at the same time, the others are held at their start
+    max_scrolling = 3
+
     def __init__(self, pos, size, base_size, font):
         self.size = size
         self.pos = pos
@@ -104,8 +218,9 @@ class ListView:
         self.scrollbar = False
         self.selected = None
         self.active = []
-        self.set_list([])
         self.update_keys = []
+        self.no_fit_keys = []
+        self.set_list([])
         self.should_update_always = False
         self.must_update = False
 
@@ -128,10 +243,28 @@ class ListView:
             self.selected = None
         self.load_new_item_position(0)
 
+    # Fits the view into a new area, keeping the list, the first row shown, the selection and the active rows
+    def relayout(self, pos, size, base_size, font):
+        self.pos = pos
+        self.size = size
+        self.base_size = base_size
+        self.font = font
+        self.max_rows = int(self.size[1] / font.size("TEXT SIZE")[1])
+        selected = self.selected
+        active = self.active
+        current_item = max(min(self.current_item, self.list_size - self.max_rows), 0)
+        self.set_list(self.list)
+        self.selected = selected
+        self.active = []
+        self.load_new_item_position(current_item)
+        if self.scrollbar:
+            self.screen_objects.get_touch_object("scrollbar").set_item(current_item)
+        self.set_active(active)
+
     # Will load items currently displaying in item_pos
     def load_new_item_position(self, item_pos):
         assert (isinstance(item_pos, int))
-        self.update_keys = []
+        self.no_fit_keys = []
         self.current_item = item_pos
         if self.scrollbar:
             self.screen_objects.clear_touch(["scrollbar"])
@@ -149,12 +282,22 @@ class ListView:
             item = TouchAndTextItem(self.font, self.list[i], (self.pos[0], current_y), (width, -1))
             current_y += item.size[1]
             if not item.fit_horizontal:
-                self.update_keys.append(str(i))
+                self.no_fit_keys.append(str(i))
             self.screen_objects.set_touch_object(str(i), item)
             i += 1
             z += 1
         self.reload_selected()
 
+    # Lets the selected row and the first rows that don't fit scroll, up to max_scrolling
+    def update_scrolling(self):
+        keys = list(self.no_fit_keys)
+        if self.selected is not None and str(self.selected) in keys:
+            keys.remove(str(self.selected))
+            keys.insert(0, str(self.selected))
+        self.update_keys = keys[:ListView.max_scrolling]
+        for key in keys:
+            self.screen_objects.get_touch_object(key).set_scrolling(key in self.update_keys)
+
     def should_update(self):
         if len(self.update_keys) > 0:
             return True
@@ -221,6 +364,20 @@ class ListView:
                 self.screen_objects.get_touch_object("scrollbar").set_item(self.current_item)
             self.set_active(self.active)
 
+    # Scroll directly to the page showing item index
+    def scroll_to(self, index):
+        assert (isinstance(index, int))
+        if not self.scrollbar or self.current_item <= index < self.current_item + self.max_rows:
+            return
+        current_item = index - index % self.max_rows
+        if current_item + self.max_rows > self.list_size:
+            current_item = self.list_size - self.max_rows
+        if current_item < 0:
+            current_item = 0
+        self.load_new_item_position(current_item)
+        self.screen_objects.get_touch_object("scrollbar").set_item(self.current_item)
+        self.set_active(self.active)
+
     # Set active items
     def set_active(self, active):
         self.must_update = True
@@ -251,15 +408,11 @@ class ListView:
                     pass
             self.selected = selected
             self.set_selected_on_screen()
+            self.update_scrolling()
 
     def set_selected_on_screen(self):
         self.must_update = True
-        if self.current_item + self.max_rows <= self.selected:
-            self.move_to(1)
-            self.set_selected_on_screen()
-        elif self.current_item > self.selected:
-            self.move_to(-1)
-            self.set_selected_on_screen()
+        self.scroll_to(self.selected)
 
     def reload_selected(self):
         self.must_update = True
@@ -268,6 +421,7 @@ class ListView:
                 self.screen_objects.get_touch_object(str(self.selected)).set_selected(True)
             except KeyError:
                 pass
+        self.update_scrolling()
 
 
 class ScreenObjectsManager:
@@ -335,13 +489,49 @@ class ScreenObjectsManager:
             self.selected_key = None
 
 
+class StaticLayer:
+    """
+    A bar and the widgets on it, drawn once into a surface of their own and blitted
+    from there on every full update. Widgets are placed relative to the layer. Whoever
+    changes one of them calls invalidate(), the layer is drawn again on its next render.
+    """
+
+    def __init__(self, pos, size, color):
+        self.pos = pos
+        self.size = size
+        self.color = color
+        self.objects = ScreenObjectsManager()
+        self.surface = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+        self.valid = False
+
+    def invalidate(self):
+        self.valid = False
+
+    def render(self, surface):
+        if not self.valid:
+            self.surface.fill(self.color)
+            self.objects.render(self.surface)
+            self.valid = True
+        surface.blit(self.surface, self.pos)
+
+    # Keys of the widgets at pos, which is in screen coordinates
+    def get_touch_objects_in_pos(self, pos):
+        return self.objects.get_touch_objects_in_pos((pos[0] - self.pos[0], pos[1] - self.pos[1]))
+
+
 class BaseItem:
+    __slots__ = ('pos', 'size', 'rect_in_pos')
+
     def __init__(self, pos, size):
         self.pos = pos
         self.size = size
-        self.rect = pygame.Rect(0, 0, self.size[0], self.size[1])
         self.rect_in_pos = pygame.Rect(self.pos[0], self.pos[1], self.size[0], self.size[1])
 
+    # Item rectangle relative to its own position
+    @property
+    def rect(self):
+        return pygame.Rect(0, 0, self.size[0], self.size[1])
+
     def get_right_pos(self):
         return self.pos[0] + self.size[0]
 
@@ -349,8 +539,36 @@ class BaseItem:
         return False
 
 
+# Renders text into box. The pixels of the first keep characters, keep_width pixels wide, are kept as they are.
+# Boxes are allocated with some spare width, so typing does not need a new surface for every character.
+# Returns (box, text width).
+def render_text_into(font, text, color, box=None, keep=0, keep_width=0):
+    suffix = font.render(text[keep:], True, color)
+    width = keep_width + suffix.get_width()
+    height = suffix.get_height()
+    if box is None or box.get_width() < width or box.get_height() != height:
+        if keep > 0:
+            return render_text_into(font, text, color)
+        box = pygame.Surface((max(int(width * 1.25), 1), height), pygame.SRCALPHA).convert_alpha()
+    else:
+        box.fill((0, 0, 0, 0), (keep_width, 0, box.get_width() - keep_width, height))
+    # MAX on a cleared area copies the glyphs as they are instead of blending them onto black
+    box.blit(suffix, (keep_width, 0), special_flags=pygame.BLEND_RGBA_MAX)
+    return box, width
+
+
+def common_prefix_length(text, other):
+    return len(os.path.commonprefix([text, other]))
+
+
 class TextItem(BaseItem):
-    scroll_speed = 2
+    __slots__ = ('font', 'text', 'scroll_no_fit', 'box', 'text_width', 'background', 'fit_horizontal',
+                 'fit_vertical', 'fixed_size', 'scrolling', 'marquee_start', 'strip', 'strip_box',
+                 'scroll_white_gap', 'margin', 'center')
+
+    # pixels per second
+    scroll_speed = 24
+    color = (255, 255, 255)
 
     def __init__(self, font, text, pos, size, center=False, background=None, scroll_no_fit=True):
         logger.debug(f'type of text is {type(text)}')
@@ -358,53 +576,71 @@ class TextItem(BaseItem):
         self.font = font
         self.text = text
         self.scroll_no_fit = scroll_no_fit
-        self.color = (255, 255, 255)
-        self.box = self.font.render(text, True, self.color)
-        self.box = self.box.convert_alpha()
+        self.box, self.text_width = render_text_into(self.font, text, self.color)
         self.background = background
+        self.center = center
+        self.scrolling = scroll_no_fit
+        self.strip = None
+        self.strip_box = None
+        self.fixed_size = size is not None
         if size is not None:
             if size[1] == -1:
                 height = self.font.size(text)[1]
-                BaseItem.__init__(self, pos, (size[0], height))
+                super().__init__(pos, (size[0], height))
             else:
-                BaseItem.__init__(self, pos, size)
+                super().__init__(pos, size)
         else:
-            BaseItem.__init__(self, pos, self.font.size(text))
-        if size is not None:
-            if self.pos[0] + self.box.get_rect().width > pos[0] + size[0]:
+            super().__init__(pos, self.font.size(text))
+        self.update_fit()
+
+    def update_fit(self):
+        if self.fixed_size:
+            if self.text_width > self.size[0]:
                 self.fit_horizontal = False
-                self.step = 0
-                self.step_2 = None
+                self.marquee_start = scheduler.now
+                self.strip = None
                 self.scroll_white_gap = self.font.get_height() * 4
             else:
                 self.fit_horizontal = True
-            if self.pos[1] + self.box.get_rect().height > pos[1] + size[1]:
-                self.fit_vertical = False
-            else:
-                self.fit_vertical = True
+            self.fit_vertical = self.box.get_height() <= self.size[1]
         else:
             self.fit_horizontal = True
             self.fit_vertical = True
         self.margin = 0
-        self.center = center
         if self.center:
             if self.fit_horizontal:
-                self.margin = (self.size[0] - self.box.get_rect().width) / 2
+                self.margin = (self.size[0] - self.text_width) / 2
 
+    # The marquee moves with the scheduler clock, there is nothing to step here
     def update(self):
-        if self.scroll_no_fit and not self.fit_horizontal:
-            self.step += TextItem.scroll_speed
-            if self.step_2 is None:
-                if (self.box.get_rect().width - self.step + self.scroll_white_gap) < self.size[0]:
-                    self.step_2 = self.box.get_rect().width - self.step + self.scroll_white_gap
-            else:
-                self.step_2 -= TextItem.scroll_speed
-                if self.step_2 < 0:
-                    self.step = 0 - self.step_2
-                    self.step_2 = None
+        if self.is_scrolling():
+            scheduler.request_frame()
             return True
         else:
-            return BaseItem.update(self)
+            return super().update()
+
+    def is_scrolling(self):
+        return self.scroll_no_fit and self.scrolling and not self.fit_horizontal
+
+    # Text that doesn't fit can be held at its start, e.g. when too many items scroll at once
+    def set_scrolling(self, scrolling):
+        if scrolling != self.scrolling:
+            self.scrolling = scrolling
+            self.strip = None
+            if not self.fit_horizontal:
+                self.marquee_start = scheduler.now
+
+    # The text, the gap and the start of the text again, so every frame is one blit out of the strip
+    def get_strip(self):
+        if self.strip is None or self.strip_box is not self.box:
+            width = self.text_width + self.scroll_white_gap
+            self.strip = pygame.Surface((width + self.size[0], self.box.get_height()), pygame.SRCALPHA).convert_alpha()
+            self.strip.fill((0, 0, 0, 0))
+            for x in (0, width):
+                self.strip.blit(self.box, (x, 0), area=(0, 0, self.text_width, self.box.get_height()),
+                                special_flags=pygame.BLEND_RGBA_MAX)
+            self.strip_box = self.box
+        return self.strip
 
     def render(self, surface):
         if self.background:
@@ -412,25 +648,38 @@ class TextItem(BaseItem):
             pygame.draw.rect(surface, (0, 0, 0), self.rect_in_pos, 1)
         if self.fit_horizontal:
             surface.blit(
-                self.box, ((self.pos[0] + self.margin), self.pos[1]), area=self.rect)
+                self.box, ((self.pos[0] + self.margin), self.pos[1]), area=(0, 0, self.size[0], self.size[1]))
         else:
-            if self.scroll_no_fit:
-                surface.blit(self.box, self.pos, area=pygame.Rect(self.step, 0, self.size[0], self.size[1]))
-                if self.step_2 is not None:
-                    surface.blit(self.box, (self.pos[0] + self.step_2, self.pos[1]),
-                                 area=pygame.Rect(0, 0, self.size[0] - self.step_2, self.size[1]))
+            if self.is_scrolling():
+                offset = int((scheduler.now - self.marquee_start) * TextItem.scroll_speed) % \
+                    (self.text_width + self.scroll_white_gap)
+                surface.blit(self.get_strip(), self.pos, area=pygame.Rect(offset, 0, self.size[0], self.size[1]))
+            elif self.scroll_no_fit:
+                surface.blit(self.box, self.pos, area=pygame.Rect(0, 0, self.size[0], self.size[1]))
             else:
-                step = self.box.get_rect().width - self.size[0]
+                step = self.text_width - self.size[0]
                 surface.blit(self.box, self.pos, area=pygame.Rect(step, 0, self.size[0], self.size[1]))
 
+    # Width of the first keep characters of text, measured only if it is not the current text
+    def get_prefix_width(self, keep):
+        if keep == len(self.text):
+            return self.text_width
+        elif keep == 0:
+            return 0
+        return self.font.size(self.text[:keep])[0]
+
+    # Only the part after the common prefix of the old and the new text is rendered again
     def set_text(self, text, change_size):
         if text != self.text:
+            keep = common_prefix_length(self.text, text)
+            self.box, self.text_width = render_text_into(self.font, text, self.color, self.box, keep,
+                                                         self.get_prefix_width(keep))
+            self.text = text
+            self.fixed_size = not change_size
             if change_size:
-                TextItem.__init__(self, self.font, text, self.pos, None, self.center,
-                                  self.background, self.scroll_no_fit)
-            else:
-                TextItem.__init__(self, self.font, text, self.pos, self.size, self.center,
-                                  self.background, self.scroll_no_fit)
+                self.size = (self.text_width, self.box.get_height())
+                self.rect_in_pos = pygame.Rect(self.pos[0], self.pos[1], self.size[0], self.size[1])
+            self.update_fit()
 
     def add_text(self, add_text, change_size):
         self.set_text(self.text + add_text, change_size)
@@ -439,18 +688,37 @@ class TextItem(BaseItem):
         self.set_text(self.text[:-chars], change_size)
 
 
+# (width, height) -> (selected_box, selected_box_rectangle)
+selection_overlays = {}
+max_selection_overlays = 32
+
+
+# Only one item is selected at a time, so all items of the same size share their overlays
+def get_selection_overlays(size):
+    size = (int(size[0]), int(size[1]))
+    overlays = selection_overlays.get(size)
+    if overlays is None:
+        if len(selection_overlays) >= max_selection_overlays:
+            selection_overlays.clear()
+        selected_box = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+        selected_box.fill((0, 0, 0, 128))
+        selected_box_rectangle = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+        pygame.draw.rect(selected_box_rectangle, (255, 255, 255),
+                         selected_box_rectangle.get_rect(), int(size[1] / 10) + 1)
+        overlays = (selected_box, selected_box_rectangle)
+        selection_overlays[size] = overlays
+    return overlays
+
+
+# Mixin for items that can be touched, selected and activated.
+# It has no slots of its own, subclasses declare 'active' and 'selected'.
 class TouchObject(BaseItem):
-    def __init__(self, pos, size):
-        BaseItem.__init__(self, pos, size)
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.active = False
         self.selected = False
-        self.selected_box = pygame.Surface(size, pygame.SRCALPHA)
-        self.selected_box = self.selected_box.convert_alpha()
-        self.selected_box.fill((0, 0, 0, 128))
-        self.selected_box_rectangle = pygame.Surface(size, pygame.SRCALPHA)
-        self.selected_box_rectangle = self.selected_box_rectangle.convert_alpha()
-        pygame.draw.rect(self.selected_box_rectangle, (255, 255, 255),
-                         self.selected_box_rectangle.get_rect(), int(size[1] / 10) + 1)
 
     def is_pos_inside(self, pos):
         return self.rect_in_pos.collidepoint(pos)
@@ -463,36 +731,40 @@ class TouchObject(BaseItem):
 
     def render(self, surface):
         if self.selected:
-            surface.blit(self.selected_box, self.pos)
-            surface.blit(self.selected_box_rectangle, self.pos)
+            selected_box, selected_box_rectangle = get_selection_overlays(self.size)
+            surface.blit(selected_box, self.pos)
+            surface.blit(selected_box_rectangle, self.pos)
 
     def pre_render(self, surface):
         if self.selected:
-            surface.blit(self.selected_box, self.pos)
+            surface.blit(get_selection_overlays(self.size)[0], self.pos)
 
     def post_render(self, surface):
         if self.selected:
-            surface.blit(self.selected_box_rectangle, self.pos)
+            surface.blit(get_selection_overlays(self.size)[1], self.pos)
 
 
 class TouchAndTextItem(TouchObject, TextItem):
-    def __init__(self, font, text, pos, size, center=False, background=None, scroll_no_fit=True):
+    __slots__ = ('active', 'selected', 'normal_box', 'active_box')
 
-        TextItem.__init__(self, font, text, pos, size, center=center,
-                          background=background, scroll_no_fit=scroll_no_fit)
+    active_color = (0, 150, 255)
 
-        TouchObject.__init__(self, pos, self.size)
-        self.active_color = (0, 150, 255)
+    def __init__(self, font, text, pos, size, center=False, background=None, scroll_no_fit=True):
+        super().__init__(font, text, pos, size, center=center, background=background, scroll_no_fit=scroll_no_fit)
         self.normal_box = self.box
-        self.active_box = self.font.render(text, True, self.active_color)
+        self.active_box = render_text_into(self.font, text, self.active_color)[0]
 
     def update(self):
         return TextItem.update(self)
 
     def set_text(self, text, change_size):
+        if text != self.text:
+            keep = common_prefix_length(self.text, text)
+            self.active_box = render_text_into(self.font, text, self.active_color, self.active_box, keep,
+                                               self.get_prefix_width(keep))[0]
+        self.box = self.normal_box
         TextItem.set_text(self, text, change_size)
         self.normal_box = self.box
-        self.active_box = self.font.render(text, True, self.active_color)
 
     def set_active(self, active):
         TouchObject.set_active(self, active)
@@ -507,54 +779,172 @@ class TouchAndTextItem(TouchObject, TextItem):
         TouchObject.post_render(self, surface)
 
 
+glyph_atlases = {}
+max_glyph_atlases = 8
+
+
+class GlyphAtlas:
+    """
+    Glyphs of one font and color rendered once, so labels made of few different
+    characters (like the time of the progress bar) can be composed without rendering text.
+    All digits share the width of the widest one, so a label doesn't move while it counts.
+    """
+
+    __slots__ = ('font', 'color', 'glyphs', 'digit_width', 'height')
+
+    def __init__(self, font, color):
+        self.font = font
+        self.color = color
+        self.glyphs = {}
+        self.digit_width = max(self.get_glyph(c).get_width() for c in "0123456789")
+        self.height = font.get_linesize()
+
+    @staticmethod
+    def get(font, color):
+        key = (font, color)
+        atlas = glyph_atlases.get(key)
+        if atlas is None:
+            if len(glyph_atlases) >= max_glyph_atlases:
+                glyph_atlases.clear()
+            atlas = GlyphAtlas(font, color)
+            glyph_atlases[key] = atlas
+        return atlas
+
+    def get_glyph(self, char):
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            glyph = self.font.render(char, True, self.color).convert_alpha()
+            self.glyphs[char] = glyph
+        return glyph
+
+    def get_width(self, char):
+        if char.isdigit():
+            return self.digit_width
+        return self.get_glyph(char).get_width()
+
+    # Returns the cell of each character of text, relative to the left of the label
+    def layout(self, text):
+        cells = []
+        x = 0
+        for char in text:
+            width = self.get_width(char)
+            cells.append((char, pygame.Rect(x, 0, width, self.height)))
+            x += width
+        return cells
+
+    def draw(self, surface, char, cell):
+        glyph = self.get_glyph(char)
+        surface.blit(glyph, (cell.x + (cell.width - glyph.get_width()) // 2, cell.y))
+
+
 class Progressbar(TouchObject):
+    """
+    The bar, its frame and its label are composed into one surface. Changing the value
+    only fills the pixels between the old and the new position and changing the label
+    only redraws the characters that differ. The changed areas are kept in dirty_rects
+    until they are drawn with render_update().
+    """
+
+    __slots__ = ('active', 'selected', 'value', 'max', 'surface', 'value_text', 'text', 'atlas', 'cells',
+                 'pos_pixel', 'frame_width', 'dirty_rects')
+
+    back_color = (0, 0, 0, 128)
+    main_color = (0, 150, 255, 150)
+
     def __init__(self, font, text, pos, size, max_value, value_text):
-        BaseItem.__init__(self, pos, size)
+        super().__init__(pos, size)
         self.value = 0
         self.max = max_value
-        self.back_color = (0, 0, 0, 128)
-        self.main_color = (0, 150, 255, 150)
+        self.value_text = value_text
+        self.atlas = GlyphAtlas.get(font, TextItem.color)
+        self.text = ""
+        self.cells = []
+        self.pos_pixel = 0
+        self.frame_width = int(size[1] / 20) + 1
+        self.dirty_rects = []
         self.surface = pygame.Surface(self.size, pygame.SRCALPHA).convert_alpha()
         self.surface.fill(self.back_color)
-        self.value_text = value_text
-
-        self.text = TextItem(font, str(max_value), pos, None)
-        self.text.set_text(str(self.value), True)
-
-        # Rectangle
-        self.rectangle = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
-        pygame.draw.rect(self.rectangle, (255, 255, 255), self.rectangle.get_rect(), int(size[1] / 20) + 1)
+        self.draw_frame(self.surface.get_rect())
+        self.set_text(str(self.value))
 
     def render(self, surface):
         surface.blit(self.surface, self.pos)
-        surface.blit(self.rectangle, self.pos)
-        self.text.render(surface)
+        self.dirty_rects = []
+
+    # Draws only the parts that changed since the last render
+    def render_update(self, surface):
+        for rect in self.dirty_rects:
+            surface.blit(self.surface, (self.pos[0] + rect.x, self.pos[1] + rect.y), rect)
+        self.dirty_rects = []
+
+    def find_update_rects(self, rects):
+        for rect in self.dirty_rects:
+            rects.append(rect.move(self.pos))
+
+    # The frame is filled side by side, pygame.draw.rect fills the whole clip area for thick borders
+    def draw_frame(self, rect):
+        width, height = self.size
+        w = self.frame_width
+        for side in ((0, 0, width, w), (0, height - w, width, w), (0, 0, w, height), (width - w, 0, w, height)):
+            self.surface.fill((255, 255, 255), rect.clip(side))
+
+    # Redraws the bar with the frame and the label inside of rect
+    def redraw(self, rect):
+        rect = rect.clip(self.surface.get_rect())
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        main = rect.clip(pygame.Rect(0, 0, self.pos_pixel, self.size[1]))
+        self.surface.fill(self.back_color, rect)
+        if main.width > 0:
+            self.surface.fill(self.main_color, main)
+        self.draw_frame(rect)
+        self.surface.set_clip(rect)
+        for char, cell in self.cells:
+            if cell.colliderect(rect):
+                self.atlas.draw(self.surface, char, cell)
+        self.surface.set_clip(None)
+        self.dirty_rects.append(rect)
 
     def set_value(self, value):
         if value != self.value:
             self.value = value
             if self.value_text:
                 self.set_text(str(self.value))
-            self.surface.fill(self.back_color)
-            pos_pixel = value * self.size[0] / self.max
-            rect = pygame.Rect(0, 0, pos_pixel, self.size[1])
-            self.surface.fill(self.main_color, rect)
+            pos_pixel = int(min(max(value * self.size[0] / self.max, 0), self.size[0])) if self.max > 0 else 0
+            if pos_pixel != self.pos_pixel:
+                rect = pygame.Rect(min(pos_pixel, self.pos_pixel), 0, abs(pos_pixel - self.pos_pixel), self.size[1])
+                self.pos_pixel = pos_pixel
+                self.redraw(rect)
 
     def get_pos_value(self, pos):
         x = pos[0] - self.pos[0]
         return x * self.max / self.size[0]
 
     def set_text(self, text):
-        self.text.set_text(text, True)
-        self.text.pos = (self.pos[0] + self.size[0] / 2 - self.text.size[0] / 2,
-                         self.pos[1] + self.size[1] / 2 - self.text.size[1] / 2)
+        if text == self.text:
+            return
+        cells = self.atlas.layout(text)
+        width = sum(cell.width for char, cell in cells)
+        offset = (int(self.size[0] / 2 - width / 2), int(self.size[1] / 2 - self.atlas.height / 2))
+        for char, cell in cells:
+            cell.move_ip(offset)
+        old_cells = self.cells
+        self.text = text
+        self.cells = cells
+        if len(cells) == len(old_cells) and all(a[1] == b[1] for a, b in zip(cells, old_cells)):
+            changed = [cell for (char, cell), (old_char, old_cell) in zip(cells, old_cells) if char != old_char]
+        else:
+            changed = [cell for char, cell in old_cells] + [cell for char, cell in cells]
+        for cell in changed:
+            self.redraw(cell)
 
 
 class ScrollBar(TouchObject):
+    __slots__ = ('active', 'selected', 'max', 'items_on_screen', 'current_item', 'back_bar', 'bar_pos',
+                 'bar_size', 'bar')
+
     def __init__(self, pos, size, max_value, items_on_screen):
-        BaseItem.__init__(self, pos, (pos[0] + size[0], pos[1] + size[1]))
-        self.pos = pos
-        self.size = size
+        super().__init__(pos, size)
         self.max = max_value
         self.items_on_screen = items_on_screen
         self.current_item = 0
@@ -566,7 +956,7 @@ class ScrollBar(TouchObject):
         else:
             self.bar_size = math.ceil(
                 float(self.items_on_screen) / float(self.max) * float(self.size[1]))
-        self.bar = pygame.Surface((self.size[0], self.bar_size)).convert()
+        self.bar = new_surface((self.size[0], self.bar_size))
         self.bar.fill((255, 255, 255))
 
     def render(self, surface):
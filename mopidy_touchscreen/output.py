@@ -0,0 +1,103 @@
+import logging
+import mmap
+import os
+
+import pygame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+
+class DisplayOutput:
+    """
+    Shows the composed frames on the SDL display.
+    """
+
+    # rects None means the whole frame
+    def present(self, frame, rects):
+        display = pygame.display.get_surface()
+        if rects is None:
+            display.blit(frame, (0, 0))
+            pygame.display.flip()
+        else:
+            for rect in rects:
+                display.blit(frame, rect, area=rect)
+            pygame.display.update(rects)
+
+    def close(self):
+        pass
+
+
+class FramebufferOutput:
+    """
+    Writes the composed frames to a memory mapped 16 bit framebuffer device, as used by
+    most SPI panels. Only the rects that changed are converted to RGB565, with NumPy.
+    Frames that already are RGB565 (surface_depth = 16) are copied as they are.
+    """
+
+    def __init__(self, device, size, stride=None):
+        if numpy is None:
+            raise RuntimeError('the framebuffer output needs NumPy')
+        self.device = device
+        self.size = size
+        if stride is None:
+            stride = size[0] * 2
+        self.fd = os.open(device, os.O_RDWR)
+        try:
+            self.map = mmap.mmap(self.fd, stride * size[1], mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        except Exception:
+            os.close(self.fd)
+            raise
+        # rows of the framebuffer, a row may be longer than the visible width
+        self.pixels = numpy.frombuffer(self.map, dtype=numpy.uint16).reshape(size[1], stride // 2)
+
+    # Reads the geometry of /dev/fbN from sysfs
+    @staticmethod
+    def open(device, size):
+        sysfs = os.path.join('/sys/class/graphics', os.path.basename(device))
+        with open(os.path.join(sysfs, 'bits_per_pixel')) as f:
+            bits_per_pixel = int(f.read())
+        if bits_per_pixel != 16:
+            raise RuntimeError(f'{device} has {bits_per_pixel} bits per pixel, only 16 are supported')
+        with open(os.path.join(sysfs, 'stride')) as f:
+            stride = int(f.read())
+        with open(os.path.join(sysfs, 'virtual_size')) as f:
+            width, height = (int(value) for value in f.read().split(','))
+        if width < size[0] or height < size[1]:
+            logger.warning(f'{device} is {width}x{height}, smaller than the configured screen')
+            size = (min(width, size[0]), min(height, size[1]))
+        return FramebufferOutput(device, size, stride)
+
+    def present(self, frame, rects):
+        bounds = pygame.Rect((0, 0), self.size).clip(frame.get_rect())
+        if rects is None:
+            rects = [bounds]
+        rgb565 = frame.get_bitsize() == 16 and frame.get_masks()[:3] == (0xf800, 0x07e0, 0x001f)
+        if rgb565:
+            pixels = pygame.surfarray.pixels2d(frame)
+        else:
+            pixels = pygame.surfarray.pixels3d(frame)
+        try:
+            for rect in rects:
+                rect = bounds.clip(rect)
+                if rect.width == 0 or rect.height == 0:
+                    continue
+                # surfarray is indexed x first, the framebuffer y first
+                area = pixels[rect.left:rect.right, rect.top:rect.bottom]
+                if not rgb565:
+                    red = area[..., 0].astype(numpy.uint16)
+                    green = area[..., 1].astype(numpy.uint16)
+                    blue = area[..., 2].astype(numpy.uint16)
+                    area = ((red & 0xf8) << 8) | ((green & 0xfc) << 3) | (blue >> 3)
+                self.pixels[rect.top:rect.bottom, rect.left:rect.right] = area.T
+        finally:
+            del pixels
+
+    def close(self):
+        self.pixels = None
+        self.map.close()
+        os.close(self.fd)
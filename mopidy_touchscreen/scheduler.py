@@ -0,0 +1,103 @@
+import heapq
+import logging
+import time
+
+import pygame
+
+logger = logging.getLogger(__name__)
+
+# Posted from other threads to wake up the UI loop
+WAKE_EVENT = pygame.event.custom_type()
+
+
+class Timer:
+    __slots__ = ('deadline', 'callback', 'cancelled')
+
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return self.deadline < other.deadline
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    Monotonic clock of the UI loop.
+
+    Animations derive their state from now instead of counting frames, so a slow frame
+    is skipped instead of slowing them down. Everything that changes over time asks for
+    the frame it needs with request_frame() or request_frame_at(), timers run from tick().
+    The loop sleeps in wait() until the earliest of these deadlines or until an event arrives.
+    """
+
+    frame_rate = 12
+    # seconds, the loop wakes up at least this often
+    max_sleep = 1
+
+    def __init__(self):
+        self.now = time.monotonic()
+        self.frame_deadline = None
+        self.timers = []
+
+    # Starts a frame: updates now and runs the timers that are due
+    def tick(self):
+        self.now = time.monotonic()
+        self.frame_deadline = None
+        while len(self.timers) > 0 and self.timers[0].deadline <= self.now:
+            timer = heapq.heappop(self.timers)
+            if not timer.cancelled:
+                try:
+                    timer.callback()
+                except Exception:
+                    logger.exception('Timer failed')
+
+    # Asks for the next frame as soon as the frame rate allows
+    def request_frame(self):
+        self.request_frame_at(self.now + 1 / Scheduler.frame_rate)
+
+    def request_frame_at(self, deadline):
+        if self.frame_deadline is None or deadline < self.frame_deadline:
+            self.frame_deadline = deadline
+
+    def call_later(self, delay, callback):
+        timer = Timer(self.now + delay, callback)
+        heapq.heappush(self.timers, timer)
+        return timer
+
+    def next_deadline(self):
+        deadline = self.now + Scheduler.max_sleep
+        if self.frame_deadline is not None:
+            deadline = min(deadline, self.frame_deadline)
+        while len(self.timers) > 0 and self.timers[0].cancelled:
+            heapq.heappop(self.timers)
+        if len(self.timers) > 0:
+            deadline = min(deadline, self.timers[0].deadline)
+        return deadline
+
+    # Sleeps until the next deadline or the next event, returns the events that arrived
+    def wait(self):
+        timeout = int((self.next_deadline() - time.monotonic()) * 1000)
+        events = []
+        if timeout > 0:
+            event = pygame.event.wait(timeout)
+            if event.type != pygame.NOEVENT:
+                events.append(event)
+        events.extend(pygame.event.get())
+        return [event for event in events if event.type != WAKE_EVENT]
+
+    # Can be called from any thread
+    @staticmethod
+    def wake():
+        try:
+            pygame.event.post(pygame.event.Event(WAKE_EVENT))
+        except pygame.error:
+            # The display is not initialised yet, the loop has not started sleeping
+            pass
+
+
+scheduler = Scheduler()
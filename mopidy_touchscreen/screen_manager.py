@@ -1,19 +1,66 @@
 import logging
+import math
 import os
+import time
 import traceback
+from collections import OrderedDict, deque
 from enum import Enum
+from threading import Thread
 
 import mopidy.core
 import pygame
-from pkg_resources import Requirement, resource_filename
 
-from .graphic_utils import DynamicBackground, ScreenObjectsManager, TouchAndTextItem
+from .graphic_utils import DynamicBackground, StaticLayer, TouchAndTextItem, convert_surface, new_surface
 from .input_manager import InputManager, InputEvent
 from .screens import BaseScreen, Keyboard, LibraryScreen, MainScreen, MenuScreen, PlaylistScreen, SearchScreen, \
     Tracklist
+from .scheduler import scheduler
+from .search_index import SearchIndex
+from .search_worker import SearchWorker
 
 logger = logging.getLogger(__name__)
 
+# The fonts are installed with the package, see MANIFEST.in
+try:
+    from importlib.resources import files
+    font_base = str(files(__package__) / 'NotoSans-Regular.ttf')
+    font_icon = str(files(__package__) / 'icomoon.ttf')
+except ImportError:
+    # Python < 3.9, Mopidy imports pkg_resources there anyway
+    from pkg_resources import resource_filename
+    font_base = resource_filename(__package__, 'NotoSans-Regular.ttf')
+    font_icon = resource_filename(__package__, 'icomoon.ttf')
+
+
+def get_splash_file(cache):
+    return os.path.join(cache, 'splash.bmp')
+
+
+def write_splash(frame, path):
+    # pygame picks the format by extension, replacing the file makes sure a half written one is never loaded
+    temp_path = path + '.new.bmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pygame.image.save(frame, temp_path)
+        os.replace(temp_path, path)
+    except (pygame.error, OSError) as e:
+        logger.warning(f'could not save splash {path}: {e}')
+
+
+# Shows the last frame of the previous run until the first frame is drawn
+def show_splash(output, cache, size):
+    path = get_splash_file(cache)
+    if not os.path.isfile(path):
+        return
+    try:
+        image = pygame.image.load(path)
+    except pygame.error as e:
+        logger.warning(f'could not load splash {path}: {e}')
+        return
+    if image.get_size() == size:
+        output.present(convert_surface(image), None)
+
+
 Screen = Enum('Screen', 'Search Player Tracklist Library Playlists Menu')
 ScreenNames = {
     'search': Screen.Search,
@@ -37,85 +84,171 @@ class ScreenManager:
         # Init variables in init
         self.base_size = None
         self.size = None
-        self.screens = None
+        # screens are built on first use, see get_screen()
+        self.screens = {}
+        self.screens_to_build = []
+        self.screen_size = None
+        # screen -> changes that arrived while it was hidden, see forward()
+        self.pending_calls = {}
+        self.calls_deferred = 0
+        self.calls_coalesced = 0
         # avoid cyclic import of this package from screens.py
         self.screen_type = Screen
         self.track = None
         self.input_manager = InputManager(size)
-        self.down_bar_objects = ScreenObjectsManager()
         self.down_bar = None
         self.keyboard = None
+        # size -> Keyboard, built on first use and reused
+        self.keyboard_cache = {}
+        self.search_index = SearchIndex()
+        self.search_worker = SearchWorker(core)
         self.update_type = BaseScreen.update_all
+        # callables queued by worker threads, run from update() on the UI thread
+        self.ui_calls = deque()
 
-        self.inactivity_timer_count = 0
+        # seconds without input until the main screen is shown again, 0 disables it
         self.inactivity_timer = 0
-        self.frame_count = 0
+        self.inactivity_timer_handle = None
+        # screen -> ((screen, background generation, screen generation), surface) of the frame it showed last,
+        # least recently viewed first
+        self.frame_cache = OrderedDict()
+        self.screen_cache_size = 3
+        # surface of the last restored frame, reused by store_frame()
+        self.spare_frame = None
+        # key of the frame in the back buffer, None if it does not show a screen
+        self.frame_key = None
+        # (seconds, keyframes) of the cover crossfade
+        self.crossfade = (DynamicBackground.crossfade_duration, DynamicBackground.crossfade_keyframes)
+
+        # The last frame is saved on shutdown and, at most every splash_interval seconds,
+        # after the screen or the track changed. Progress updates alone don't count, SD cards wear out.
+        self.splash_interval = 300
+        self.splash_changed = False
+        self.splash_thread = None
+
+        # Frames are composed at render_scale percent of the display size and scaled up to it.
+        # With automatic scaling the scale follows the time a frame takes, see adjust_render_scale().
+        self.display_size = size
+        self.display_buffer = None
+        self.render_scale = 100
+        self.auto_render_scale = False
+        self.render_scales = (100, 75, 50)
+        # seconds, average time of the frames that were composed in full since the last step
+        self.frame_time = 0
+        self.full_frames = 0
+        self.render_scale_checked = scheduler.now
+        self.render_scale_interval = 5  # seconds
+        # full frames needed at a scale before it is changed
+        self.render_scale_frames = 10
 
         self.resolution_factor = resolution_factor
 
         self.init_manager(size)
-
-        self.last_surface = pygame.Surface(size)
+        scheduler.call_later(self.splash_interval, self.splash_timeout)
 
     def init_manager(self, size):
-        self.size = size
-        self.base_size = self.size[1] / self.resolution_factor
+        self.layout(size)
+        self.track = None
 
-        self.background = DynamicBackground(self.size)
-        font_icon = resource_filename(Requirement.parse("mopidy-touchscreen"), "mopidy_touchscreen/icomoon.ttf")
+        # Only the start screen is built before the first frame, the others follow after it, one per frame.
+        # The player goes first, it loads the cover for the background.
+        self.screens = {}
+        self.pending_calls = {}
+        self.screens_to_build = sorted((screen for screen in Screen if screen != self.current_screen),
+                                       key=lambda screen: screen != Screen.Player)
+        self.change_screen(self.current_screen)
 
-        font_base = resource_filename(Requirement.parse("mopidy-touchscreen"),
-                                      "mopidy_touchscreen/NotoSans-Regular.ttf")
-        self.fonts['base'] = pygame.font.Font(font_base, int(self.base_size * 0.9))
-        self.fonts['icon'] = pygame.font.Font(font_icon, int(self.base_size * 0.9))
+        self.update_type = BaseScreen.update_all
 
-        self.track = None
+    # Creates everything that depends on the size of the display
+    def layout(self, size):
+        self.size = size
+        base_size = self.size[1] / self.resolution_factor
+
+        # Frames are composed here. Partial updates draw over the last frame, so it is kept from frame to frame.
+        self.back_buffer = new_surface(self.size)
+        self.frame_cache.clear()
+        self.spare_frame = None
+        self.frame_key = None
+        # The cover is kept, it is not loaded and faded in again
+        if self.background is None:
+            self.background = DynamicBackground(self.size)
+            self.background.set_crossfade(*self.crossfade)
+        else:
+            self.background.resize(self.size)
+        # The fonts only depend on the height
+        if base_size != self.base_size:
+            self.base_size = base_size
+            self.fonts['base'] = pygame.font.Font(font_base, int(self.base_size * 0.9))
+            self.fonts['icon'] = pygame.font.Font(font_icon, int(self.base_size * 0.9))
 
         # Menu buttons
 
         button_size = (self.size[0] / 6, self.base_size)
 
+        # Down bar
+        bar_height = int(button_size[1])
+        self.down_bar = StaticLayer((0, self.size[1] - bar_height), (self.size[0], bar_height), (0, 0, 0, 200))
+
         menu_icons = [u" \ue986", u" \ue600", u"\ue60d", u" \ue604", u" \ue605", u" \ue60a"]
 
         x = 0
         i = 0
-        button = None
         while i < 6:
-            button = TouchAndTextItem(self.fonts['icon'], menu_icons[i],
-                                      (x, self.size[1] - self.base_size), button_size, center=True)
-            self.down_bar_objects.set_touch_object("menu_" + Screen(i + 1).name, button)
+            button = TouchAndTextItem(self.fonts['icon'], menu_icons[i], (x, 0), button_size, center=True)
+            self.down_bar.objects.set_touch_object("menu_" + Screen(i + 1).name, button)
             x = button.get_right_pos()
             i += 1
-            button.pos = (button.pos[0], self.size[1] - button.rect_in_pos.size[1])
-
-        # Down bar
-        self.down_bar = pygame.Surface((self.size[0], button.rect_in_pos.size[1]), pygame.SRCALPHA)
-        self.down_bar.fill((0, 0, 0, 200))
-
-        screen_size = (size[0], self.size[1] - button.rect.size[1])
 
+        self.screen_size = (size[0], self.size[1] - bar_height)
+        for screen in Screen:
+            self.down_bar.objects.get_touch_object('menu_' + screen.name).set_active(screen == self.current_screen)
+
+    def build_screen(self, screen):
+        start = time.monotonic()
+        size = self.screen_size
+        if screen == Screen.Search:
+            instance = SearchScreen(size, self.base_size, self, self.fonts)
+        elif screen == Screen.Player:
+            instance = MainScreen(size, self.base_size, self, self.fonts, self.cache, self.core, self.background)
+        elif screen == Screen.Tracklist:
+            instance = Tracklist(size, self.base_size, self, self.fonts)
+        elif screen == Screen.Library:
+            instance = LibraryScreen(size, self.base_size, self, self.fonts)
+        elif screen == Screen.Playlists:
+            instance = PlaylistScreen(size, self.base_size, self, self.fonts)
+        else:
+            instance = MenuScreen(size, self.base_size, self, self.fonts, self.core)
+        self.screens[screen] = instance
+        if screen in self.screens_to_build:
+            self.screens_to_build.remove(screen)
+
+        # Changes that happened before the screen existed
+        if screen == Screen.Player:
+            instance.mute_changed(self.core.mixer.get_mute().get())
+            playback_state = self.core.playback.get_state().get()
+            instance.playback_state_changed(playback_state, playback_state)
+        elif screen == Screen.Menu:
+            instance.options_changed()
+            instance.check_connection()
+        logger.info(f'built screen "{screen.name}" in {(time.monotonic() - start) * 1000:.0f} ms')
+        return instance
+
+    def get_screen(self, screen):
+        instance = self.screens.get(screen)
+        if instance is None:
+            instance = self.build_screen(screen)
+        return instance
+
+    # Builds one of the screens that were not shown yet, so the first visit of a screen doesn't wait for it
+    def build_next_screen(self):
+        screen = self.screens_to_build.pop(0)
         try:
-            self.screens = {
-                Screen.Search: SearchScreen(screen_size, self.base_size, self, self.fonts),
-                Screen.Player: MainScreen(screen_size, self.base_size, self, self.fonts,
-                                          self.cache, self.core, self.background),
-                Screen.Tracklist: Tracklist(screen_size, self.base_size, self, self.fonts),
-                Screen.Library: LibraryScreen(screen_size, self.base_size, self, self.fonts),
-                Screen.Playlists: PlaylistScreen(screen_size, self.base_size, self, self.fonts),
-                Screen.Menu: MenuScreen(screen_size, self.base_size, self, self.fonts, self.core)
-            }
-        except:
-            traceback.print_exc()
-
-        self.options_changed()
-        self.mute_changed(self.core.mixer.get_mute().get())
-        playback_state = self.core.playback.get_state().get()
-        self.playback_state_changed(playback_state, playback_state)
-        self.screens[Screen.Menu].check_connection()
-
-        self.change_screen(self.current_screen)
-
-        self.update_type = BaseScreen.update_all
+            self.build_screen(screen)
+        except Exception:
+            logger.exception(f'building screen "{screen.name}" failed')
+        if len(self.screens_to_build) > 0:
+            scheduler.request_frame_at(scheduler.now)
 
     def get_update_type(self):
         if self.update_type == BaseScreen.update_all:
@@ -123,7 +256,10 @@ class ScreenManager:
             return BaseScreen.update_all
         else:
             if self.keyboard:
-                return BaseScreen.no_update
+                if self.keyboard.should_update():
+                    return BaseScreen.update_partial
+                else:
+                    return BaseScreen.no_update
             else:
                 if self.background.should_update():
                     return BaseScreen.update_all
@@ -136,77 +272,246 @@ class ScreenManager:
     def set_inactivity_timeout(self, timeout):
         self.inactivity_timer = timeout
 
-    def reset_inactivity_timer(self):
-        self.inactivity_timer_count = self.inactivity_timer
-
-    def inactivity_timeout(self):
-        if self.inactivity_timer_count <= 0:
-            return False
-
-        if self.frame_count <= 0:
-            self.frame_count = 12
-
-        self.frame_count -= 1
-        if self.frame_count > 0:
+    def set_crossfade(self, duration, keyframes):
+        self.crossfade = (duration, keyframes)
+        self.background.set_crossfade(duration, keyframes)
+
+    def set_screen_cache_size(self, size):
+        self.screen_cache_size = size
+        while len(self.frame_cache) > size:
+            self.frame_cache.popitem(last=False)
+
+    def get_frame_key(self, screen):
+        return screen, self.background.generation, self.screens[screen].generation
+
+    # Keeps the frame of the screen that is left, if it still shows its current state
+    def store_frame(self):
+        if self.screen_cache_size <= 0 or self.frame_key != self.get_frame_key(self.current_screen):
+            return
+        entry = self.frame_cache.pop(self.current_screen, None)
+        if entry is None and len(self.frame_cache) >= self.screen_cache_size:
+            entry = self.frame_cache.popitem(last=False)[1]
+        if entry is not None:
+            surface = entry[1]
+        elif self.spare_frame is not None:
+            surface = self.spare_frame
+            self.spare_frame = None
+        else:
+            surface = new_surface(self.size)
+        surface.blit(self.back_buffer, (0, 0))
+        self.frame_cache[self.current_screen] = (self.frame_key, surface)
+
+    # Puts the cached frame of the current screen into the back buffer if nothing changed since it was shown.
+    # The entry is taken out: partial updates change the back buffer without changing the key, so the frame
+    # is only valid until the next one. store_frame() puts it back when the screen is left.
+    def restore_frame(self):
+        entry = self.frame_cache.pop(self.current_screen, None)
+        if entry is None:
             return False
-
-        self.inactivity_timer_count -= 1
-        if self.inactivity_timer_count > 0:
+        self.spare_frame = entry[1]
+        if entry[0] != self.get_frame_key(self.current_screen):
             return False
-
+        self.back_buffer.blit(entry[1], (0, 0))
         return True
 
-    def update(self, screen):
-        if self.main_screen is not None and self.current_screen != self.main_screen and self.inactivity_timeout():
+    def reset_inactivity_timer(self):
+        if self.inactivity_timer_handle is not None:
+            self.inactivity_timer_handle.cancel()
+            self.inactivity_timer_handle = None
+        if self.inactivity_timer > 0:
+            self.inactivity_timer_handle = scheduler.call_later(self.inactivity_timer, self.inactivity_timeout)
+
+    def inactivity_timeout(self):
+        self.inactivity_timer_handle = None
+        if self.main_screen is not None and self.current_screen != self.main_screen:
             self.change_screen(self.main_screen)
 
+    def run_on_ui_thread(self, func, *args):
+        self.ui_calls.append((func, args))
+        scheduler.wake()
+
+    def process_ui_calls(self):
+        while len(self.ui_calls) > 0:
+            func, args = self.ui_calls.popleft()
+            try:
+                func(*args)
+            except Exception:
+                traceback.print_exc()
+            # Calls from screens only change that screen, anything else may change all of them
+            screen = getattr(func, '__self__', None)
+            if isinstance(screen, BaseScreen):
+                screen.invalidate()
+            else:
+                self.frame_cache.clear()
+            self.update_type = BaseScreen.update_all
+
+    # output shows the frame, see output.py
+    def update(self, output):
+        self.process_ui_calls()
+
         update_type = self.get_update_type()
         if update_type != BaseScreen.no_update:
+            start = time.perf_counter()
+            composed = False
             rects = []
+            surface = self.back_buffer
             if update_type == BaseScreen.update_partial:
-                surface = self.last_surface
-                self.screens[self.current_screen].find_update_rects(rects)
-                self.background.draw_background_in_rects(surface, rects)
+                if self.keyboard:
+                    self.keyboard.find_update_rects(rects)
+                else:
+                    self.screens[self.current_screen].find_update_rects(rects)
+                    self.background.draw_background_in_rects(surface, rects)
+                self.render(surface, update_type, rects)
+            elif self.keyboard or not self.restore_frame():
+                self.background.draw_background(surface)
+                self.render(surface, update_type, rects)
+                composed = True
             else:
-                surface = self.background.draw_background()
+                # Marquees and the progress clock ask for their next frame while they are drawn,
+                # a restored frame was not drawn so the next one checks them
+                scheduler.request_frame()
 
             if self.keyboard:
-                self.keyboard.update(surface, update_type, rects)
+                self.frame_key = None
             else:
-                self.screens[self.current_screen].update(surface, update_type, rects)
-                surface.blit(self.down_bar, (0, self.size[1] - self.down_bar.get_size()[1]))
-                self.down_bar_objects.render(surface)
+                self.frame_key = self.get_frame_key(self.current_screen)
 
+            if self.display_buffer is not None:
+                surface, rects = self.scale_frame(update_type, rects)
             if update_type == BaseScreen.update_all:
-                screen.blit(surface, (0, 0))
-                pygame.display.flip()
+                output.present(surface, None)
             else:
-                for rect in rects:
-                    screen.blit(surface, rect, area=rect)
-                    pygame.display.update(rects)
-            self.last_surface = surface
+                output.present(surface, rects)
+
+            # Only frames that were composed in full count, partial and restored ones are cheap at any scale
+            if composed:
+                elapsed = time.perf_counter() - start
+                if self.full_frames == 0:
+                    self.frame_time = elapsed
+                else:
+                    self.frame_time += (elapsed - self.frame_time) * 0.1
+                self.full_frames += 1
+                if self.auto_render_scale:
+                    self.adjust_render_scale()
+
+        # The rest of the screens are built after the first frame is shown
+        if len(self.screens_to_build) > 0:
+            self.build_next_screen()
+
+    # Scales the composed frame, or the rects of it that changed, to the display
+    def scale_frame(self, update_type, rects):
+        if update_type == BaseScreen.update_all:
+            pygame.transform.scale(self.back_buffer, self.display_size, self.display_buffer)
+            return self.display_buffer, None
+        factor_x = self.display_size[0] / self.size[0]
+        factor_y = self.display_size[1] / self.size[1]
+        display_rects = []
+        for rect in rects:
+            rect = self.back_buffer.get_rect().clip(rect)
+            if rect.width == 0 or rect.height == 0:
+                continue
+            left = int(rect.left * factor_x)
+            top = int(rect.top * factor_y)
+            display_rect = pygame.Rect(left, top, math.ceil(rect.right * factor_x) - left,
+                                       math.ceil(rect.bottom * factor_y) - top)
+            display_rect = self.display_buffer.get_rect().clip(display_rect)
+            pygame.transform.scale(self.back_buffer.subsurface(rect), display_rect.size,
+                                   self.display_buffer.subsurface(display_rect))
+            display_rects.append(display_rect)
+        return self.display_buffer, display_rects
+
+    # Saves the frame shown last for show_splash(). The file is written by a worker thread,
+    # with wait set it is written before returning.
+    def save_splash(self, wait=False):
+        if self.splash_thread is not None and self.splash_thread.is_alive():
+            if not wait:
+                return
+            self.splash_thread.join()
+        self.splash_changed = False
+        frame = (self.back_buffer if self.display_buffer is None else self.display_buffer).copy()
+        path = get_splash_file(self.cache)
+        if wait:
+            write_splash(frame, path)
+        else:
+            self.splash_thread = Thread(target=write_splash, args=(frame, path), name="Save Splash")
+            self.splash_thread.start()
+
+    def splash_timeout(self):
+        if self.splash_changed:
+            self.save_splash()
+        scheduler.call_later(self.splash_interval, self.splash_timeout)
+
+    def render(self, surface, update_type, rects):
+        if self.keyboard:
+            self.keyboard.update(surface, update_type, rects)
+        else:
+            self.screens[self.current_screen].update(surface, update_type, rects)
+            if update_type == BaseScreen.update_all:
+                self.down_bar.render(surface)
+
+    # Hands a change to a screen. Screens that are not built yet read the current state when they are.
+    # Hidden screens get it when they are shown, a newer change with the same key replaces the older one.
+    def forward(self, screen, method, *args, key=None, immediate=False):
+        instance = self.screens.get(screen)
+        if instance is None:
+            return
+        if screen != self.current_screen and not immediate:
+            pending = self.pending_calls.setdefault(screen, OrderedDict())
+            if key is None:
+                key = method
+            if pending.pop(key, None) is not None:
+                self.calls_coalesced += 1
+            pending[key] = (method, args)
+            self.calls_deferred += 1
+            return
+        getattr(instance, method)(*args)
+        instance.invalidate()
+        self.update_type = BaseScreen.update_all
+
+    def apply_pending_calls(self, screen):
+        pending = self.pending_calls.pop(screen, None)
+        if pending is None:
+            return
+        instance = self.screens[screen]
+        for method, args in pending.values():
+            getattr(instance, method)(*args)
+        instance.invalidate()
+        logger.debug(f'screen "{screen.name}": applied {len(pending)} calls, '
+                     f'{self.calls_coalesced} of {self.calls_deferred} deferred calls skipped so far')
 
     def track_started(self, track):
         self.track = track
-        self.screens[Screen.Player].track_started(track.track)
-        self.screens[Screen.Tracklist].track_started(track)
+        self.splash_changed = True
+        # The player is kept current, its cover is the background of every screen
+        self.forward(Screen.Player, 'track_started', track.track, immediate=True)
+        self.forward(Screen.Tracklist, 'track_started', track)
+        self.forward(Screen.Search, 'track_started', track)
 
     def track_playback_ended(self, tl_track, time_position):
-        self.screens[Screen.Player].track_playback_ended(tl_track, time_position)
+        self.forward(Screen.Player, 'track_playback_ended', tl_track, time_position, immediate=True)
 
     def event(self, event):
+        # Positions are in display coordinates, the screens are laid out in render coordinates
+        if self.display_buffer is not None and 'pos' in event.dict:
+            pos = (int(event.pos[0] * self.size[0] / self.display_size[0]),
+                   int(event.pos[1] * self.size[1] / self.display_size[1]))
+            event = pygame.event.Event(event.type, dict(event.dict, pos=pos))
         event = self.input_manager.event(event)
         if event is not None:
             self.reset_inactivity_timer()
             if self.keyboard is not None:
+                # the keyboard tracks which of its keys need a redraw, the screen that opened it gets the text
                 self.keyboard.touch_event(event)
+                self.screens[self.current_screen].invalidate()
+                return
             elif not self.manage_event(event):
                 self.screens[self.current_screen].touch_event(event)
+                self.screens[self.current_screen].invalidate()
             self.update_type = BaseScreen.update_all
 
     def manage_event(self, event):
         if event.type == InputEvent.action.click:
-            objects = self.down_bar_objects.get_touch_objects_in_pos(event.current_pos)
+            objects = self.down_bar.get_touch_objects_in_pos(event.current_pos)
             return self.click_on_objects(objects, event)
         else:
             if event.type == InputEvent.action.key_press and not event.longpress:
@@ -270,30 +575,30 @@ class ScreenManager:
             return False
 
     def volume_changed(self, volume):
-        self.screens[Screen.Player].volume_changed(volume)
-        self.update_type = BaseScreen.update_all
+        self.forward(Screen.Player, 'volume_changed', volume)
 
     def playback_state_changed(self, old_state, new_state):
-        self.screens[Screen.Player].playback_state_changed(
-            old_state, new_state)
-        self.update_type = BaseScreen.update_all
+        self.forward(Screen.Player, 'playback_state_changed', old_state, new_state)
 
     def mute_changed(self, mute):
-        self.screens[Screen.Player].mute_changed(mute)
-        self.update_type = BaseScreen.update_all
+        self.forward(Screen.Player, 'mute_changed', mute)
 
     def tracklist_changed(self):
-        self.screens[Screen.Tracklist].tracklist_changed()
-        self.update_type = BaseScreen.update_all
+        self.forward(Screen.Tracklist, 'tracklist_changed')
 
     def options_changed(self):
-        self.screens[Screen.Menu].options_changed()
-        self.update_type = BaseScreen.update_all
+        self.forward(Screen.Menu, 'options_changed')
 
     def change_screen(self, new_screen):
         logger.info(f'switching to screen "{new_screen.name}"')
-        self.down_bar_objects.get_touch_object('menu_' + self.current_screen.name).set_active(False)
-        self.down_bar_objects.get_touch_object('menu_' + new_screen.name).set_active(True)
+        if new_screen != self.current_screen:
+            self.store_frame()
+            self.splash_changed = True
+        self.get_screen(new_screen)
+        self.apply_pending_calls(new_screen)
+        self.down_bar.objects.get_touch_object('menu_' + self.current_screen.name).set_active(False)
+        self.down_bar.objects.get_touch_object('menu_' + new_screen.name).set_active(True)
+        self.down_bar.invalidate()
         self.current_screen = new_screen
         self.update_type = BaseScreen.update_all
 
@@ -310,23 +615,102 @@ class ScreenManager:
         return False
 
     def playlists_loaded(self):
-        self.screens[Screen.Playlists].playlists_loaded()
-        self.update_type = BaseScreen.update_all
+        self.forward(Screen.Playlists, 'playlists_loaded')
+
+    def playlist_changed(self, playlist):
+        self.forward(Screen.Playlists, 'playlist_changed', playlist, key=('playlist_changed', playlist.uri))
+
+    def playlist_deleted(self, uri):
+        self.forward(Screen.Playlists, 'playlist_deleted', uri, key=('playlist_deleted', uri))
 
     def search(self, query, mode):
-        self.screens[Screen.Search].search(query, mode)
+        self.get_screen(Screen.Search)
+        self.forward(Screen.Search, 'search', query, mode, immediate=True)
+
+    # percent of the display size, 0 chooses it under load
+    def set_render_scale(self, scale):
+        self.auto_render_scale = scale == 0
+        if self.auto_render_scale:
+            scale = self.render_scales[0]
+        self.render_scale = max(min(scale, 100), 25)
+        self.frame_time = 0
+        self.full_frames = 0
+        self.render_scale_checked = scheduler.now
+        self.resize(self.display_size)
+
+    def get_render_size(self):
+        return (max(int(self.display_size[0] * self.render_scale / 100), 1),
+                max(int(self.display_size[1] * self.render_scale / 100), 1))
+
+    # Goes down a step if full frames take most of their time at the frame rate, up if they would still
+    # be fast at the larger scale. The gap between the limits, the interval and the number of frames
+    # needed keep it from switching back and forth.
+    def adjust_render_scale(self):
+        if scheduler.now - self.render_scale_checked < self.render_scale_interval or \
+                self.full_frames < self.render_scale_frames:
+            return
+        self.render_scale_checked = scheduler.now
+        budget = 1 / scheduler.frame_rate
+        step = self.render_scales.index(self.render_scale) if self.render_scale in self.render_scales else 0
+        if self.frame_time > budget * 0.8 and step + 1 < len(self.render_scales):
+            step += 1
+        # A frame takes about as much longer as it has more pixels
+        elif step > 0 and \
+                self.frame_time * (self.render_scales[step - 1] / self.render_scales[step]) ** 2 < budget * 0.5:
+            step -= 1
+        else:
+            return
+        logger.info(f'frames take {self.frame_time * 1000:.0f} ms, render scale {self.render_scales[step]}%')
+        self.render_scale = self.render_scales[step]
+        self.frame_time = 0
+        self.full_frames = 0
+        self.resize(self.display_size)
+
+    # Lays out the screens for a new display size. Screens that can't keep their state through
+    # relayout() are built again, the current one at once and the others after the next frame.
+    def resize(self, size):
+        self.display_size = size
+        if self.render_scale < 100:
+            self.display_buffer = new_surface(size)
+        else:
+            self.display_buffer = None
+        # The display surface is new, even if the frames keep their size
         self.update_type = BaseScreen.update_all
-
-    def resize(self, event):
-        self.init_manager(event.size)
+        size = self.get_render_size()
+        if size == self.size:
+            return
+        self.layout(size)
+        self.input_manager = InputManager(size)
+        for screen, instance in list(self.screens.items()):
+            if not instance.relayout(self.screen_size, self.base_size):
+                del self.screens[screen]
+                self.pending_calls.pop(screen, None)
+                if screen not in self.screens_to_build:
+                    self.screens_to_build.append(screen)
+        self.screens_to_build.sort(key=lambda screen: screen != Screen.Player)
+        self.get_screen(self.current_screen)
+        self.apply_pending_calls(self.current_screen)
+
+        # Keyboards are built for one size, an open one is opened again with its text
+        self.keyboard_cache = {}
+        if self.keyboard is not None:
+            listener = self.keyboard.listener
+            text = self.keyboard.other_objects.get_object("text").text
+            self.open_keyboard(listener)
+            self.keyboard.open(listener, text)
         self.update_type = BaseScreen.update_all
 
     def stream_title_changed(self, title):
-        self.screens[Screen.Player].stream_title_changed(title)
-        self.update_type = BaseScreen.update_all
+        # Goes with the track, a title deferred past the next track_started would be wrong
+        self.forward(Screen.Player, 'stream_title_changed', title, immediate=True)
 
     def open_keyboard(self, input_listener):
-        self.keyboard = Keyboard(self.size, self.base_size, self, self.fonts, input_listener)
+        keyboard = self.keyboard_cache.get(self.size)
+        if keyboard is None:
+            keyboard = Keyboard(self.size, self.base_size, self, self.fonts)
+            self.keyboard_cache[self.size] = keyboard
+        keyboard.open(input_listener)
+        self.keyboard = keyboard
         self.update_type = BaseScreen.update_all
 
     def close_keyboard(self):
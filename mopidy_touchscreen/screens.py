@@ -5,31 +5,41 @@ import hashlib
 import logging
 import os
 import traceback
-import time
 import urllib.request
 import urllib.parse
 from threading import Thread
 from enum import Enum
 import socket
-from mopidy.models import Track
+from mopidy.models import Ref, Track
 
-from .graphic_utils import Progressbar, ScreenObjectsManager, TextItem, TouchAndTextItem, ListView
+from .graphic_utils import Progressbar, ScreenObjectsManager, StaticLayer, TextItem, TouchAndTextItem, ListView, \
+    convert_surface, new_surface
 
 from .input_manager import InputEvent
+from .scheduler import scheduler
 
 logger = logging.getLogger(__name__)
 
-try:
-    import musicbrainzngs
-    _use_musicbrainz = True
-    musicbrainzngs.set_useragent(
-        "mopidy-touchtft",
-        "1.1.0"
-        "https://github.com/woelfisch/mopidy-touchscreen"
-    )
-except:
-    _use_musicbrainz = False
-    logger.info('Module musicbrainz-ngs not found. Will not download cover art.')
+# Imported on the first cover that is not found in the library, False if it is not installed
+_musicbrainz = None
+
+
+def get_musicbrainz():
+    global _musicbrainz
+    if _musicbrainz is None:
+        try:
+            import musicbrainzngs
+            musicbrainzngs.set_useragent(
+                "mopidy-touchtft",
+                "1.1.0"
+                "https://github.com/woelfisch/mopidy-touchscreen"
+            )
+            _musicbrainz = musicbrainzngs
+        except ImportError:
+            _musicbrainz = False
+            logger.info('Module musicbrainz-ngs not found. Will not download cover art.')
+    return _musicbrainz
+
 
 class BaseScreen:
     update_all = 0
@@ -41,6 +51,19 @@ class BaseScreen:
         self.base_size = base_size
         self.manager = manager
         self.fonts = fonts
+        # changes whenever the screen may look different, frames of older generations are not reused
+        self.generation = 0
+
+    def invalidate(self):
+        self.generation += 1
+
+    # Fits the screen into a new size. Screens that keep their state through it return True,
+    # the others are built again. The fonts are already the ones for the new size.
+    def relayout(self, size, base_size):
+        self.size = size
+        self.base_size = base_size
+        self.invalidate()
+        return False
 
     def find_update_rects(self, rects):
         pass
@@ -66,8 +89,14 @@ class BaseScreen:
 
 
 class Keyboard(BaseScreen):
+    """
+    On-screen keyboard, built once per screen size and reused through open().
+
+    Both layouts are pre-rendered without selection, partial updates only redraw
+    the keys whose selection changed and the edited text.
+    """
 
-    def __init__(self, size, base_size, manager, fonts, listener):
+    def __init__(self, size, base_size, manager, fonts, listener=None):
         BaseScreen.__init__(self, size, base_size, manager, fonts)
         self.base_width = size[0] / 10
         self.base_height = size[1] / 5
@@ -147,27 +176,89 @@ class Keyboard(BaseScreen):
         button = TouchAndTextItem(self.font, "",
                                   (0, 0), (self.size[0], self.base_height), center=False, scroll_no_fit=False)
         self.other_objects.set_object("text", button)
+
+        self.layout_surfaces = [self.render_layout(0), self.render_layout(1)]
+        # selected items as last drawn, to find the ones that need a redraw
+        self.drawn_selected = []
+        self.text_dirty = False
+        self.layout_dirty = False
+        self.open(listener)
+
+    def render_layout(self, layout):
+        surface = new_surface(self.size)
+        surface.fill((0, 0, 0))
+        for key in self.keyboards[layout].touch_objects.values():
+            TextItem.render(key, surface)
+        for button in self.other_objects.touch_objects.values():
+            TextItem.render(button, surface)
+        return surface
+
+    def open(self, listener, text=""):
+        self.listener = listener
+        self.other_objects.get_object("text").set_text(text, False)
+        self.current_keyboard = 0
+        self.selected_row = 0
+        self.selected_col = 0
+        self.keyboards[0].set_selected(None)
+        self.keyboards[1].set_selected(None)
         self.selected_others = 3
         self.set_selected_other()
 
+    def get_selected_items(self):
+        selected = []
+        if self.keyboards[self.current_keyboard].selected is not None:
+            selected.append(self.keyboards[self.current_keyboard].selected)
+        if self.other_objects.selected is not None:
+            selected.append(self.other_objects.selected)
+        return selected
+
+    def get_dirty_items(self):
+        selected = self.get_selected_items()
+        dirty = [item for item in self.drawn_selected if item not in selected]
+        dirty += [item for item in selected if item not in self.drawn_selected]
+        if self.text_dirty:
+            dirty.append(self.other_objects.get_object("text"))
+        return dirty
+
+    def should_update(self):
+        return self.layout_dirty or len(self.get_dirty_items()) > 0
+
+    def find_update_rects(self, rects):
+        if self.layout_dirty:
+            rects.append(pygame.Rect(0, 0, self.size[0], self.size[1]))
+        else:
+            for item in self.get_dirty_items():
+                rects.append(item.rect_in_pos)
+
     def update(self, screen, update_type, rects):
-        screen.fill((0, 0, 0))
-        self.keyboards[self.current_keyboard].render(screen)
-        self.other_objects.render(screen)
+        layout_surface = self.layout_surfaces[self.current_keyboard]
+        if update_type == BaseScreen.update_all or self.layout_dirty:
+            screen.blit(layout_surface, (0, 0))
+            items = self.get_selected_items() + [self.other_objects.get_object("text")]
+        else:
+            items = self.get_dirty_items()
+            for item in items:
+                screen.blit(layout_surface, item.rect_in_pos, area=item.rect_in_pos)
+        for item in items:
+            item.update()
+            item.render(screen)
+        self.drawn_selected = self.get_selected_items()
+        self.text_dirty = False
+        self.layout_dirty = False
 
     def touch_event(self, touch_event):
         if touch_event.type == InputEvent.action.click:
             keys = self.keyboards[self.current_keyboard].get_touch_objects_in_pos(touch_event.current_pos)
             for key in keys:
-                self.other_objects.get_object("text").add_text(key, False)
+                self.add_text(key)
             keys = self.other_objects.get_touch_objects_in_pos(touch_event.current_pos)
             for key in keys:
                 if key == 'symbols':
                     self.change_keyboard()
                 elif key == "remove":
-                    self.other_objects.get_object("text").remove_text(1, False)
+                    self.remove_text(1)
                 elif key == "space":
-                    self.other_objects.get_object("text").add_text(" ", False)
+                    self.add_text(" ")
                 elif key == "ok":
                     text = self.other_objects.get_object("text").text
                     self.listener.text_input(text)
@@ -175,9 +266,9 @@ class Keyboard(BaseScreen):
         elif touch_event.type == InputEvent.action.key_press:
             if not isinstance(touch_event.unicode, int):
                 if touch_event.unicode == u'\x08':
-                    self.other_objects.get_object("text").remove_text(1, False)
+                    self.remove_text(1)
                 else:
-                    self.other_objects.get_object("text").add_text(touch_event.unicode, False)
+                    self.add_text(touch_event.unicode)
             elif touch_event.direction is not None:
                 x = 0
                 y = 0
@@ -199,6 +290,7 @@ class Keyboard(BaseScreen):
             self.current_keyboard = 1
         else:
             self.current_keyboard = 0
+        self.layout_dirty = True
         if self.selected_others < 0:
             self.change_selected(0, 0)
 
@@ -274,9 +366,9 @@ class Keyboard(BaseScreen):
             if self.selected_others == 0:
                 self.change_keyboard()
             elif self.selected_others == 1:
-                self.other_objects.get_object("text").remove_text(1, False)
+                self.remove_text(1)
             elif self.selected_others == 2:
-                self.other_objects.get_object("text").add_text(" ", False)
+                self.add_text(" ")
             elif self.selected_others == 3:
                 text = self.other_objects.get_object("text").text
                 self.listener.text_input(text)
@@ -284,7 +376,19 @@ class Keyboard(BaseScreen):
         else:
             key = self.keys[self.current_keyboard][
                 self.selected_row][self.selected_col]
-            self.other_objects.get_object("text").add_text(key, False)
+            self.add_text(key)
+
+    def add_text(self, text):
+        text_item = self.other_objects.get_object("text")
+        text_item.add_text(text, False)
+        self.text_dirty = True
+        self.listener.text_changed(text_item.text)
+
+    def remove_text(self, chars):
+        text_item = self.other_objects.get_object("text")
+        text_item.remove_text(chars, False)
+        self.text_dirty = True
+        self.listener.text_changed(text_item.text)
 
     def set_selected_other(self):
         key = None
@@ -308,6 +412,11 @@ class LibraryScreen(BaseScreen):
         self.library_strings = None
         self.browse_uri(None)
 
+    def relayout(self, size, base_size):
+        BaseScreen.relayout(self, size, base_size)
+        self.list_view.relayout((0, 0), self.size, self.base_size, self.fonts['base'])
+        return True
+
     def go_inside_directory(self, uri):
         self.directory_list.append(self.current_directory)
         self.current_directory = uri
@@ -318,6 +427,7 @@ class LibraryScreen(BaseScreen):
         if uri is not None:
             self.library_strings.append("../")
         self.library = self.manager.core.library.browse(uri).get()
+        self.manager.search_index.add(self.library)
         for lib in self.library:
             self.library_strings.append(lib.name)
         self.list_view.set_list(self.library_strings)
@@ -386,31 +496,62 @@ class MainScreen(BaseScreen):
         self.track_duration = "00:00"
         self.has_to_update_progress = False
         self.touch_text_manager = ScreenObjectsManager()
+        # 'track', 'no_cover' or 'ended', how the track labels are laid out
+        self.labels = None
+        self.build_top_bar()
         current_track = self.core.playback.get_current_track().get()
         if current_track is None:
             self.track_playback_ended(None, None)
         else:
             self.track_started(current_track)
 
-        # Top bar
-        self.top_bar = pygame.Surface((self.size[0], self.base_size), pygame.SRCALPHA)
-        self.top_bar.fill((0, 0, 0, 128))
+        self.top_bar.objects.get_touch_object("volume").set_value(self.core.mixer.get_volume().get())
+        self.progress_show = False
+
+    # Play/pause, mute and volume
+    def build_top_bar(self):
+        self.top_bar = StaticLayer((0, 0), (self.size[0], self.base_size), (0, 0, 0, 128))
 
         # Play/pause
         button = TouchAndTextItem(self.fonts['icon'], u"\ue615 ", (0, 0), None)
-        self.touch_text_manager.set_touch_object("pause_play", button)
+        self.top_bar.objects.set_touch_object("pause_play", button)
         x = button.get_right_pos()
 
         # Mute
         button = TouchAndTextItem(self.fonts['icon'], u"\ue61f ", (x, 0), None)
-        self.touch_text_manager.set_touch_object("mute", button)
+        self.top_bar.objects.set_touch_object("mute", button)
         x = button.get_right_pos()
 
         # Volume
         progress = Progressbar(self.fonts['base'], "100", (x, 0), (self.size[0] - x, self.base_size), 100, True)
-        self.touch_text_manager.set_touch_object("volume", progress)
-        progress.set_value(self.core.mixer.get_volume().get())
-        self.progress_show = False
+        self.top_bar.objects.set_touch_object("volume", progress)
+
+    # Lays out what is shown again, without asking the core. The cover is scaled until a sharp one is loaded.
+    def relayout(self, size, base_size):
+        top_bar = self.top_bar
+        BaseScreen.relayout(self, size, base_size)
+        self.build_top_bar()
+        for key in ("pause_play", "mute"):
+            button = self.top_bar.objects.get_touch_object(key)
+            button.set_text(top_bar.objects.get_touch_object(key).text, False)
+            button.set_active(top_bar.objects.get_touch_object(key).active)
+        self.top_bar.objects.get_touch_object("volume").set_value(top_bar.objects.get_touch_object("volume").value)
+
+        labels = self.labels
+        if self.track is not None:
+            self.layout_track()
+        if labels == 'no_cover':
+            self.layout_no_cover()
+        elif labels == 'ended':
+            self.layout_ended()
+        # The new progress bar is set on the next frame
+        self.current_track_pos = None
+
+        if self.image is not None:
+            self.image = pygame.transform.scale(self.image, self.get_cover_size())
+            thread = Thread(target=self.load_image, args=(False,), name="Load Cover")
+            thread.start()
+        return True
 
     def should_update(self):
         if len(self.update_keys) > 0:
@@ -432,12 +573,11 @@ class MainScreen(BaseScreen):
             item = self.touch_text_manager.get_object(key)
             rects.append(item.rect_in_pos)
         if self.progress_show and self.has_to_update_progress:
-            item = self.touch_text_manager.get_touch_object("time_progress")
-            rects.append(item.rect_in_pos)
+            self.touch_text_manager.get_touch_object("time_progress").find_update_rects(rects)
 
     def update(self, screen, update_type, rects):
         if update_type == BaseScreen.update_all:
-            screen.blit(self.top_bar, (0, 0))
+            self.top_bar.render(screen)
             self.update_progress()
             self.has_to_update_progress = False
             self.touch_text_manager.render(screen)
@@ -446,7 +586,7 @@ class MainScreen(BaseScreen):
 
         if update_type == BaseScreen.update_partial and self.track is not None:
             if self.has_to_update_progress:
-                self.touch_text_manager.get_touch_object("time_progress").render(screen)
+                self.touch_text_manager.get_touch_object("time_progress").render_update(screen)
                 self.has_to_update_progress = False
             for key in self.update_keys:
                 item = self.touch_text_manager.get_object(key)
@@ -462,14 +602,35 @@ class MainScreen(BaseScreen):
                 progress = self.touch_text_manager.get_touch_object("time_progress")
                 progress.set_value(track_pos_millis)
                 self.current_track_pos = new_track_pos
-                progress.set_text(time.strftime('%M:%S', time.gmtime(self.current_track_pos)) +
-                                  "/" + self.track_duration)
-                return True
+                progress.set_text(MainScreen.format_time(self.current_track_pos) + "/" + self.track_duration)
+                # Wake up again when the shown second changes
+                scheduler.request_frame_at(scheduler.now + (1000 - track_pos_millis % 1000) / 1000)
+                # Only the glyphs and the part of the bar that changed have to be drawn
+                return len(progress.dirty_rects) > 0
         return False
 
+    @staticmethod
+    def format_time(seconds):
+        minutes, seconds = divmod(int(seconds) % 3600, 60)
+        return f'{minutes:02d}:{seconds:02d}'
+
     def track_started(self, track):
-        self.update_keys = []
         self.image = None
+        self.track = track
+        self.layout_track()
+        self.manager.search_index.add([track])
+        if not self.is_image_in_cache():
+            thread = Thread(target=self.download_image, name="Download Cover")
+            thread.start()
+        else:
+            thread = Thread(target=self.load_image, name="Load Cover")
+            thread.start()
+
+    # Buttons, progress and labels of self.track next to the cover
+    def layout_track(self):
+        track = self.track
+        self.labels = 'track'
+        self.update_keys = []
         x = self.size[1] - self.base_size * 2
         width = self.size[0] - self.base_size / 2 - x
 
@@ -484,11 +645,11 @@ class MainScreen(BaseScreen):
         self.touch_text_manager.set_touch_object("next", button)
 
         if track.length is not None:
-            self.track_duration = time.strftime('%M:%S', time.gmtime(track.length / 1000))
+            self.track_duration = MainScreen.format_time(track.length / 1000)
 
             # Progress
-            progress = Progressbar(self.fonts['base'], time.strftime('%M:%S', time.gmtime(0)) + "/" +
-                                   time.strftime('%M:%S', time.gmtime(0)), (size_1, self.size[1] - self.base_size),
+            progress = Progressbar(self.fonts['base'], MainScreen.format_time(0) + "/" + MainScreen.format_time(0),
+                                   (size_1, self.size[1] - self.base_size),
                                    (self.size[0] - size_1 - size_2, self.base_size), track.length, False)
             self.touch_text_manager.set_touch_object("time_progress", progress)
             self.progress_show = True
@@ -525,14 +686,6 @@ class MainScreen(BaseScreen):
             self.update_keys.append("artist_name")
         self.touch_text_manager.set_object("artist_name", label)
 
-        self.track = track
-        if not self.is_image_in_cache():
-            thread = Thread(target=self.download_image, name="Download Cover")
-            thread.start()
-        else:
-            thread = Thread(target=self.load_image, name="Load Cover")
-            thread.start()
-
     def stream_title_changed(self, title):
         self.touch_text_manager.get_object("track_name").set_text(title, False)
 
@@ -571,8 +724,10 @@ class MainScreen(BaseScreen):
             self.download_image_musicbrainz(0)
 
     def download_image_musicbrainz(self, artist_index):
+        track = self.track
         found = False
-        while _use_musicbrainz and not found and artist_index < len(self.artists):
+        musicbrainzngs = get_musicbrainz()
+        while musicbrainzngs and not found and artist_index < len(self.artists):
             result = musicbrainzngs.search_releases(artist=self.artists[artist_index].name,
                                                     release=MainScreen.get_track_album_name(self.track), limit=5)
 
@@ -600,39 +755,48 @@ class MainScreen(BaseScreen):
 
         if not found:
             logger.info("Cover could not be downloaded")
+            self.manager.run_on_ui_thread(self.show_no_cover, track)
 
-            # There is no cover
-            # so it will use all the screen size for the text
-            width = self.size[0] - self.base_size
+    def show_no_cover(self, track):
+        if track != self.track:
+            return
+        self.layout_no_cover()
+        self.background.set_background_image(None)
 
-            current = TextItem(self.fonts['base'], MainScreen.get_track_name(self.track),
-                               (self.base_size / 2, self.base_size * 2), (width, -1))
+    # There is no cover, so the labels use all the screen width
+    def layout_no_cover(self):
+        self.labels = 'no_cover'
+        width = self.size[0] - self.base_size
 
-            if not current.fit_horizontal:
-                self.update_keys.append("track_name")
-            self.touch_text_manager.set_object("track_name", current)
+        current = TextItem(self.fonts['base'], MainScreen.get_track_name(self.track),
+                           (self.base_size / 2, self.base_size * 2), (width, -1))
 
-            current = TextItem(self.fonts['base'], MainScreen.get_track_album_name(self.track),
-                               (self.base_size / 2, self.base_size * 3), (width, -1))
+        if not current.fit_horizontal:
+            self.update_keys.append("track_name")
+        self.touch_text_manager.set_object("track_name", current)
 
-            if not current.fit_horizontal:
-                self.update_keys.append("album_name")
-            self.touch_text_manager.set_object("album_name", current)
+        current = TextItem(self.fonts['base'], MainScreen.get_track_album_name(self.track),
+                           (self.base_size / 2, self.base_size * 3), (width, -1))
 
-            current = TextItem(self.fonts['base'], self.get_artist_string(),
-                               (self.base_size / 2, self.base_size * 4), (width, -1))
+        if not current.fit_horizontal:
+            self.update_keys.append("album_name")
+        self.touch_text_manager.set_object("album_name", current)
 
-            if not current.fit_horizontal:
-                self.update_keys.append("artist_name")
-            self.touch_text_manager.set_object("artist_name", current)
+        current = TextItem(self.fonts['base'], self.get_artist_string(),
+                           (self.base_size / 2, self.base_size * 4), (width, -1))
 
-            self.background.set_background_image(None)
+        if not current.fit_horizontal:
+            self.update_keys.append("artist_name")
+        self.touch_text_manager.set_object("artist_name", current)
 
     def track_playback_ended(self, tl_track, time_position):
         self.background.set_background_image(None)
         self.image = None
         self.track_duration = "00:00"
+        self.layout_ended()
 
+    def layout_ended(self):
+        self.labels = 'ended'
         width = self.size[0] - self.base_size
 
         current = TextItem(self.fonts['base'], "", (self.base_size / 2, self.base_size * 2), (width, -1))
@@ -644,19 +808,39 @@ class MainScreen(BaseScreen):
         current = TextItem(self.fonts['base'], "", (self.base_size / 2, self.base_size * 4), (width, -1))
         self.touch_text_manager.set_object("artist_name", current)
 
-    def load_image(self):
+    def get_cover_size(self):
         size = int(self.size[1] - self.base_size * 3)
+        return size, size
+
+    # Runs on the cover threads, the finished images are handed to the UI thread
+    def load_image(self, with_background=True):
+        track = self.track
         image_original = pygame.image.load(self.get_cover_folder() + self.get_image_file_name())
-        image = pygame.transform.scale(image_original, (size, size))
-        image = image.convert()
+        image = pygame.transform.scale(image_original, self.get_cover_size())
+        image = convert_surface(image)
+        background_image = None
+        cover = None
+        if with_background:
+            background_image = self.background.prepare_image(image_original)
+            cover = self.background.shrink_cover(image_original)
+        self.manager.run_on_ui_thread(self.set_cover, track, image, background_image, cover)
+
+    def set_cover(self, track, image, background_image, cover=None):
+        # The track changed while the cover was loading
+        if track != self.track:
+            return
+        # The screen was laid out again while the cover was loading
+        if image.get_size() != self.get_cover_size():
+            image = pygame.transform.scale(image, self.get_cover_size())
         self.image = image
-        self.background.set_background_image(image_original)
+        if background_image is not None:
+            self.background.set_background_image(background_image, cover)
 
     def touch_event(self, event):
         if event.type == InputEvent.action.click or event.type == InputEvent.action.long_click:
-            objects = self.touch_text_manager.get_touch_objects_in_pos(event.current_pos)
-            if objects is not None:
-                self.click_on_objects(objects, event)
+            objects = self.touch_text_manager.get_touch_objects_in_pos(event.current_pos) + \
+                self.top_bar.get_touch_objects_in_pos(event.current_pos)
+            self.click_on_objects(objects, event)
 
         elif event.type == InputEvent.action.swipe:
             if event.direction == InputEvent.course.left:
@@ -732,37 +916,39 @@ class MainScreen(BaseScreen):
                     self.mute_changed(mute)
 
     def change_volume(self, event):
-        manager = self.touch_text_manager
-        volume = manager.get_touch_object("volume")
+        volume = self.top_bar.objects.get_touch_object("volume")
         pos = event.current_pos
         value = volume.get_pos_value(pos)
         self.core.mixer.set_volume(value)
 
     def playback_state_changed(self, old_state, new_state):
+        self.top_bar.invalidate()
         if new_state == mopidy.core.PlaybackState.PLAYING:
-            self.touch_text_manager.get_touch_object("pause_play").set_text(u"\ue615", False)  # |>
+            self.top_bar.objects.get_touch_object("pause_play").set_text(u"\ue615", False)  # |>
         elif new_state == mopidy.core.PlaybackState.PAUSED:
-            self.touch_text_manager.get_touch_object("pause_play").set_text(u"\ue616", False)  # ||
+            self.top_bar.objects.get_touch_object("pause_play").set_text(u"\ue616", False)  # ||
         elif new_state == mopidy.core.PlaybackState.STOPPED:
-            self.touch_text_manager.get_touch_object("pause_play").set_text(u"\ue617", False)  # []
+            self.top_bar.objects.get_touch_object("pause_play").set_text(u"\ue617", False)  # []
 
     def volume_changed(self, volume):
+        self.top_bar.invalidate()
         if not self.core.mixer.get_mute().get():
             if volume > 80:
-                self.touch_text_manager.get_touch_object("mute").set_text(u"\ue61f", False)
+                self.top_bar.objects.get_touch_object("mute").set_text(u"\ue61f", False)
             elif volume > 50:
-                self.touch_text_manager.get_touch_object("mute").set_text(u"\ue620", False)
+                self.top_bar.objects.get_touch_object("mute").set_text(u"\ue620", False)
             elif volume > 20:
-                self.touch_text_manager.get_touch_object("mute").set_text(u"\ue621", False)
+                self.top_bar.objects.get_touch_object("mute").set_text(u"\ue621", False)
             else:
-                self.touch_text_manager.get_touch_object("mute").set_text(u"\ue622", False)
-        self.touch_text_manager.get_touch_object("volume").set_value(
+                self.top_bar.objects.get_touch_object("mute").set_text(u"\ue622", False)
+        self.top_bar.objects.get_touch_object("volume").set_value(
             volume)
 
     def mute_changed(self, mute):
-        self.touch_text_manager.get_touch_object("mute").set_active(not mute)
+        self.top_bar.invalidate()
+        self.top_bar.objects.get_touch_object("mute").set_active(not mute)
         if mute:
-            self.touch_text_manager.get_touch_object("mute").set_text(u"\ue623", False)
+            self.top_bar.objects.get_touch_object("mute").set_text(u"\ue623", False)
         else:
             self.volume_changed(self.core.mixer.get_volume().get())
 
@@ -794,6 +980,11 @@ class MenuScreen(BaseScreen):
 
         self.list_view.set_list(self.list_items)
 
+    def relayout(self, size, base_size):
+        BaseScreen.relayout(self, size, base_size)
+        self.list_view.relayout((0, 0), self.size, self.base_size, self.fonts['base'])
+        return True
+
     def should_update(self):
         return self.list_view.should_update()
 
@@ -868,10 +1059,20 @@ class PlaylistScreen(BaseScreen):
         self.playlists = []
         self.selected_playlist = None
         self.playlist_tracks = []
-        self.playlist_uris = []
         self.playlist_tracks_strings = []
+        # uri -> (tracks, strings), filled lazily when a playlist is opened
+        self.playlist_items = {}
+        # bumped whenever the list of playlists changes so results of outdated loads are dropped
+        self.load_generation = 0
+        # uri -> generation of its items, the same for the items of each playlist
+        self.items_generations = {}
         self.playlists_loaded()
 
+    def relayout(self, size, base_size):
+        BaseScreen.relayout(self, size, base_size)
+        self.list_view.relayout((0, 0), self.size, self.base_size, self.fonts['base'])
+        return True
+
     def should_update(self):
         return self.list_view.should_update()
 
@@ -883,27 +1084,106 @@ class PlaylistScreen(BaseScreen):
         self.list_view.render(screen, update_all, rects)
 
     def playlists_loaded(self):
-        self.selected_playlist = None
-        self.playlists_strings = []
+        self.load_generation += 1
+        for uri in list(self.items_generations):
+            self.invalidate_items(uri)
+        self.playlist_items = {}
+        if self.selected_playlist is not None:
+            self.playlist_selected(self.selected_playlist)
+        self.load_playlists()
+
+    def playlist_changed(self, playlist):
+        self.load_generation += 1
+        self.invalidate_items(playlist.uri)
+        if self.selected_playlist is not None and self.selected_playlist.uri == playlist.uri:
+            self.playlist_selected(self.selected_playlist)
+        self.load_playlists()
+
+    def playlist_deleted(self, uri):
+        self.load_generation += 1
+        self.invalidate_items(uri)
+        if self.selected_playlist is not None and self.selected_playlist.uri == uri:
+            self.selected_playlist = None
+        self.load_playlists()
+
+    # Drops the items of a playlist and the loads of them that are still running
+    def invalidate_items(self, uri):
+        self.playlist_items.pop(uri, None)
+        self.items_generations[uri] = self.items_generations.get(uri, 0) + 1
+
+    def load_playlists(self):
+        thread = Thread(target=self.fetch_playlists, args=(self.load_generation,), name="Load Playlists")
+        thread.start()
+
+    # Runs in a worker thread, results are handed back to the UI thread
+    def fetch_playlists(self, generation):
+        try:
+            playlists = self.manager.core.playlists.as_list().get()
+        except Exception:
+            logger.exception('Loading playlists failed')
+            return
+        self.manager.run_on_ui_thread(self.set_playlists, playlists, generation)
+
+    def set_playlists(self, playlists, generation):
+        if generation != self.load_generation:
+            return
         self.playlists = []
-        for playlist in self.manager.core.playlists.as_list().get():
+        self.playlists_strings = []
+        for playlist in playlists:
             self.playlists.append(playlist)
             self.playlists_strings.append(playlist.name)
-        self.list_view.set_list(self.playlists_strings)
+        if self.selected_playlist is None:
+            self.list_view.set_list(self.playlists_strings)
 
     def playlist_selected(self, playlist):
         self.selected_playlist = playlist
-        self.playlist_tracks = []
-        self.playlist_uris = []
-        self.playlist_tracks_strings = ["../"]
-        for ref in self.manager.core.playlists.get_items(playlist.uri).get():
+        items = self.playlist_items.get(playlist.uri)
+        if items is None:
+            self.playlist_tracks = []
+            self.playlist_tracks_strings = ["../", "Loading..."]
+            self.list_view.set_list(self.playlist_tracks_strings)
+            thread = Thread(target=self.fetch_playlist_items,
+                            args=(playlist.uri, self.items_generations.get(playlist.uri, 0)), name="Load Playlist")
+            thread.start()
+        else:
+            self.show_playlist_items(playlist.uri, items)
+
+    # Runs in a worker thread, results are handed back to the UI thread
+    def fetch_playlist_items(self, uri, generation):
+        try:
+            refs = self.manager.core.playlists.get_items(uri).get()
+        except Exception:
+            logger.exception(f'Loading playlist {uri} failed')
+            self.manager.run_on_ui_thread(self.set_playlist_items, uri, None, generation)
+            return
+        tracks = []
+        tracks_strings = ["../"]
+        for ref in refs or []:
             track = Track(uri=ref.uri, name=ref.name)
-            self.playlist_tracks.append(track)
-            self.playlist_uris.append(ref.uri)
+            tracks.append(track)
             if track.name is None:
-                self.playlist_tracks_strings.append(ref.uri)
+                tracks_strings.append(ref.uri)
             else:
-                self.playlist_tracks_strings.append(ref.name)
+                tracks_strings.append(ref.name)
+        self.manager.run_on_ui_thread(self.set_playlist_items, uri, (tracks, tracks_strings), generation)
+
+    # items is None if loading failed
+    def set_playlist_items(self, uri, items, generation):
+        if generation != self.items_generations.get(uri, 0):
+            return
+        if items is None:
+            if self.selected_playlist is not None and self.selected_playlist.uri == uri:
+                self.playlist_tracks = []
+                self.playlist_tracks_strings = ["../", "Loading failed, tap to retry"]
+                self.list_view.set_list(self.playlist_tracks_strings)
+            return
+        self.playlist_items[uri] = items
+        self.manager.search_index.add(items[0])
+        if self.selected_playlist is not None and self.selected_playlist.uri == uri:
+            self.show_playlist_items(uri, items)
+
+    def show_playlist_items(self, uri, items):
+        self.playlist_tracks, self.playlist_tracks_strings = items
         self.list_view.set_list(self.playlist_tracks_strings)
 
     def touch_event(self, touch_event):
@@ -916,7 +1196,10 @@ class PlaylistScreen(BaseScreen):
                 if clicked == 0:
                     self.selected_playlist = None
                     self.list_view.set_list(self.playlists_strings)
-                else:
+                elif len(self.playlist_tracks) == 0:
+                    # still loading or failed
+                    self.playlist_selected(self.selected_playlist)
+                elif clicked - 1 < len(self.playlist_tracks):
                     self.manager.core.tracklist.clear()
                     # passing a list of tracks is deprecated, but how else do I get the names in the M3U file into the 
                     # the tracklist for streams that don't have track meta data?
@@ -931,6 +1214,12 @@ SearchMode = Enum('SearchMode', 'Track Album Artist')
 
 
 class SearchScreen(BaseScreen):
+    search_kinds = {
+        SearchMode.Track: Ref.TRACK,
+        SearchMode.Album: Ref.ALBUM,
+        SearchMode.Artist: Ref.ARTIST
+    }
+
     def __init__(self, size, base_size, manager, fonts):
         BaseScreen.__init__(self, size, base_size, manager, fonts)
         self.list_view = ListView((0, self.base_size * 2), (
@@ -938,51 +1227,65 @@ class SearchScreen(BaseScreen):
             2 * self.base_size), self.base_size, manager.fonts['base'])
         self.results_strings = []
         self.results = []
-        self.screen_objects = ScreenObjectsManager()
+        self.local_results = []
+        # scheme -> results of that backend for the current query
+        self.backend_results = {}
         self.query = ""
+        self.mode = None
+        self.mode_objects_keys = {
+            SearchMode.Track: "mode_track",
+            SearchMode.Album: "mode_album",
+            SearchMode.Artist: "mode_artist"
+        }
+        self.top_bar = None
+        self.build_top_bar()
+        self.set_mode(mode=SearchMode.Track)
+        self.set_query("Search")
+
+    def relayout(self, size, base_size):
+        BaseScreen.relayout(self, size, base_size)
+        self.list_view.relayout((0, self.base_size * 2), (self.size[0], self.size[1] - 2 * self.base_size),
+                                self.base_size, self.fonts['base'])
+        self.build_top_bar()
+        return True
+
+    # Query, search and mode buttons
+    def build_top_bar(self):
+        self.top_bar = StaticLayer((0, 0), (self.size[0], self.base_size * 2), (0, 0, 0, 128))
 
         # Search button
         button = TouchAndTextItem(self.fonts['icon'], u" \ue986", (0, self.base_size), None, center=True)
-        self.screen_objects.set_touch_object("search", button)
+        self.top_bar.objects.set_touch_object("search", button)
 
         x = button.get_right_pos()
 
         # Query text
         text = TouchAndTextItem(self.fonts['base'], self.query, (0, 0), (self.size[0], self.base_size), center=True)
-        self.screen_objects.set_touch_object("query", text)
+        self.top_bar.objects.set_touch_object("query", text)
 
         # Mode buttons
         button_size = ((self.size[0] - x) / 3, self.base_size)
-        self.mode_objects_keys = {
-            SearchMode.Track: "mode_track",
-            SearchMode.Album: "mode_album",
-            SearchMode.Artist: "mode_artist"
-        }
 
         # Track button
         button = TouchAndTextItem(self.fonts['base'], "Track",
                                   (x, self.base_size), (button_size[0], self.base_size), center=True)
-        self.screen_objects.set_touch_object(
+        self.top_bar.objects.set_touch_object(
             self.mode_objects_keys[SearchMode.Track], button)
 
         # Album button
         button = TouchAndTextItem(self.fonts['base'], "Album",
                                   (button_size[0] + x, self.base_size), button_size, center=True)
-        self.screen_objects.set_touch_object(
+        self.top_bar.objects.set_touch_object(
             self.mode_objects_keys[SearchMode.Album], button)
 
         # Artist button
         button = TouchAndTextItem(self.fonts['base'], "Artist",
                                   (button_size[0] * 2 + x, self.base_size), button_size, center=True)
-        self.screen_objects.set_touch_object(
+        self.top_bar.objects.set_touch_object(
             self.mode_objects_keys[SearchMode.Artist], button)
 
-        # Top Bar
-        self.top_bar = pygame.Surface((self.size[0], self.base_size * 2), pygame.SRCALPHA)
-        self.top_bar.fill((0, 0, 0, 128))
-        self.mode = None
-        self.set_mode(mode=SearchMode.Track)
-        self.set_query("Search")
+        if self.mode is not None:
+            self.top_bar.objects.get_touch_object(self.mode_objects_keys[self.mode]).set_active(True)
 
     def should_update(self):
         return self.list_view.should_update()
@@ -991,54 +1294,89 @@ class SearchScreen(BaseScreen):
         return self.list_view.find_update_rects(rects)
 
     def update(self, screen, update_type, rects):
-        screen.blit(self.top_bar, (0, 0))
-        self.screen_objects.render(screen)
         update_all = (update_type == BaseScreen.update_all)
+        if update_all:
+            self.top_bar.render(screen)
         self.list_view.render(screen, update_all, rects)
 
     def set_mode(self, mode=SearchMode.Track):
         if mode is not self.mode:
             self.mode = mode
             for val in self.mode_objects_keys.values():
-                self.screen_objects.get_touch_object(val).set_active(False)
-            self.screen_objects.get_touch_object(self.mode_objects_keys[self.mode]).set_active(True)
+                self.top_bar.objects.get_touch_object(val).set_active(False)
+            self.top_bar.objects.get_touch_object(self.mode_objects_keys[self.mode]).set_active(True)
+            self.top_bar.invalidate()
             self.search(self.query, self.mode)
 
     def set_query(self, query=""):
         self.query = query
-        self.screen_objects.get_touch_object("query").set_text(self.query, False)
+        self.top_bar.objects.get_touch_object("query").set_text(self.query, False)
+        self.top_bar.invalidate()
 
-    def search(self, query=None, mode=None):
+    def search(self, query=None, mode=None, delay=None):
         if query is not None:
             self.set_query(query)
         if mode is not None:
             self.set_mode(mode)
-        if self.mode == SearchMode.Track:
-            search_query = {'any': [self.query]}
-        elif self.mode == SearchMode.Album:
-            search_query = {'album': [self.query]}
-        else:
-            search_query = {'artist': [self.query]}
         if len(self.query) > 0:
-            logger.debug(f'{search_query}')
-            current_results = self.manager.core.library.search(search_query).get()
-            self.results = []
-            self.results_strings = []
-            for backend in current_results:
-                if mode == SearchMode.Track:
-                    iterable = backend.tracks
-                    logger.debug(f'results for tracks: {iterable}')
-                elif mode == SearchMode.Album:
-                    iterable = backend.albums
-                    logger.debug(f'results for albums: {iterable}')
-                else:
-                    iterable = backend.artists
-                    logger.debug(f'results for artists: {iterable}')
+            kind = SearchScreen.search_kinds[self.mode]
+            # Show what the local index knows right away, the backends fill in the rest
+            self.local_results = self.manager.search_index.search(self.query, kind)
+            cached = self.manager.search_worker.get_cached(self.query, kind)
+            if cached is not None:
+                self.manager.search_worker.cancel()
+                self.backend_results = dict(cached)
+            else:
+                self.backend_results = {}
+                self.manager.search_worker.search(self.query, kind, self.search_finished, delay)
+            self.refresh_results()
+        else:
+            self.manager.search_worker.cancel()
 
-                for result in iterable:
-                    self.results.append(result)
-                    self.results_strings.append(result.name)
-            self.list_view.set_list(self.results_strings)
+    # Called from the search worker thread, once per backend
+    def search_finished(self, query, kind, scheme, results):
+        self.manager.run_on_ui_thread(self.add_search_results, query, kind, scheme, results)
+
+    def add_search_results(self, query, kind, scheme, results):
+        self.manager.search_index.add(results)
+        if query == self.query and kind == SearchScreen.search_kinds[self.mode] and len(results) > 0:
+            self.backend_results[scheme] = results
+            self.refresh_results()
+
+    # Local matches first, then the backends in a fixed order, no matter which one answered first
+    def refresh_results(self):
+        self.results = []
+        self.results_strings = []
+        self.add_results(self.local_results)
+        schemes = self.manager.search_worker.schemes
+        for scheme in sorted(self.backend_results, key=lambda scheme: schemes.index(scheme)):
+            self.add_results(self.backend_results[scheme])
+        self.list_view.set_list(self.results_strings)
+        self.show_current_track()
+
+    # Append results not shown yet, matched by uri
+    def add_results(self, results):
+        uris = set(result.uri for result in self.results)
+        for result in results:
+            if result.uri not in uris:
+                uris.add(result.uri)
+                self.results.append(result)
+                self.results_strings.append(result.name)
+
+    def track_started(self, tl_track):
+        self.show_current_track()
+
+    # Highlight the playing track if it is among the results and scroll to it
+    def show_current_track(self):
+        active = []
+        if self.manager.track is not None:
+            uri = self.manager.track.track.uri
+            for pos, result in enumerate(self.results):
+                if result.uri == uri:
+                    active.append(pos)
+        self.list_view.set_active(active)
+        if len(active) > 0:
+            self.list_view.scroll_to(active[0])
 
     def touch_event(self, touch_event):
         if touch_event.type == InputEvent.action.click:
@@ -1048,11 +1386,11 @@ class SearchScreen(BaseScreen):
                 self.manager.core.tracklist.add(uri=self.results[clicked].uri)
                 self.manager.core.playback.play()
             else:
-                clicked = self.screen_objects.get_touch_objects_in_pos(touch_event.down_pos)
+                clicked = self.top_bar.get_touch_objects_in_pos(touch_event.down_pos)
                 if len(clicked) > 0:
                     clicked = clicked[0]
                     if clicked in self.mode_objects_keys.values():
-                        mode = [k for k, v in self.mode_object_keys if v == clicked][0]
+                        mode = [k for k, v in self.mode_objects_keys.items() if v == clicked][0]
                         logger.debug(f'mode = {mode}')
                         self.search(mode=mode)
                     if clicked == "query" or clicked == "search":
@@ -1079,6 +1417,10 @@ class SearchScreen(BaseScreen):
         return False
 
     def text_input(self, text):
+        self.search(text, self.mode, delay=0)
+
+    # Called by the keyboard on every edit
+    def text_changed(self, text):
         self.search(text, self.mode)
 
 
@@ -1091,9 +1433,17 @@ class Tracklist(BaseScreen):
         self.list_view = ListView((0, 0), size, self.base_size, self.fonts['base'])
         self.tracks = []
         self.tracks_strings = []
+        # tlid -> position in self.tracks, rebuilt whenever the tracklist changes
+        self.track_positions = {}
+        self.current_tlid = None
         self.update_list()
         self.track_started(self.manager.core.playback.get_current_tl_track().get())
 
+    def relayout(self, size, base_size):
+        BaseScreen.relayout(self, size, base_size)
+        self.list_view.relayout((0, 0), self.size, self.base_size, self.fonts['base'])
+        return True
+
     def should_update(self):
         return self.list_view.should_update()
 
@@ -1110,18 +1460,42 @@ class Tracklist(BaseScreen):
     def update_list(self):
         self.tracks = self.manager.core.tracklist.get_tl_tracks().get()
         self.tracks_strings = []
-        for tl_track in self.tracks:
+        self.track_positions = {}
+        for pos, tl_track in enumerate(self.tracks):
             logger.debug(f'tl_track is {tl_track} ({type(tl_track)}), track is {type(tl_track.track)}')
             trackname = MainScreen.get_track_name(tl_track.track)
             logger.debug(f'trackname is {trackname}\n')
             self.tracks_strings.append(trackname)
+            self.track_positions[tl_track.tlid] = pos
+        self.manager.search_index.add([tl_track.track for tl_track in self.tracks])
         self.list_view.set_list(self.tracks_strings)
+        self.set_current_track_active()
 
     def touch_event(self, touch_event):
         pos = self.list_view.touch_event(touch_event)
         if pos is not None:
             self.manager.core.playback.play(self.tracks[pos])
 
-    def track_started(self, track):
-        tlindex = self.manager.core.tracklist.index(track).get()
-        self.list_view.set_active([tlindex])
+    def track_started(self, tl_track):
+        if tl_track is None:
+            self.current_tlid = None
+        else:
+            self.current_tlid = tl_track.tlid
+        self.set_current_track_active()
+        self.show_current_track()
+
+    def get_current_track_pos(self):
+        return self.track_positions.get(self.current_tlid)
+
+    def set_current_track_active(self):
+        pos = self.get_current_track_pos()
+        if pos is None:
+            self.list_view.set_active([])
+        else:
+            self.list_view.set_active([pos])
+
+    # Move the selection to the playing track and scroll straight to its page
+    def show_current_track(self):
+        pos = self.get_current_track_pos()
+        if pos is not None:
+            self.list_view.set_selected(pos)
@@ -0,0 +1,121 @@
+import bisect
+import logging
+import re
+import threading
+from collections import deque
+
+from mopidy.models import Album, Artist, Ref, Track
+
+logger = logging.getLogger(__name__)
+
+
+class SearchIndex:
+    """
+    Inverted index over the names of tracks, albums and artists seen while browsing.
+
+    Models are queued with add() from any thread and indexed by a background worker.
+    search() answers prefix queries from memory, so it can run on every key press.
+    """
+
+    max_results = 200
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # token -> set of (kind, uri)
+        self.tokens = {}
+        # all tokens, kept sorted for prefix lookups
+        self.sorted_tokens = []
+        # (kind, uri) -> model
+        self.items = {}
+        self.queue = deque()
+        self.queued = threading.Event()
+        self.worker = None
+
+    @staticmethod
+    def tokenize(text):
+        if text is None:
+            return []
+        return re.findall(r'\w+', text.casefold())
+
+    def add(self, models):
+        self.queue.append(list(models))
+        if self.worker is None:
+            self.worker = threading.Thread(target=self.run, name="Search Index", daemon=True)
+            self.worker.start()
+        self.queued.set()
+
+    def run(self):
+        while True:
+            self.queued.wait()
+            self.queued.clear()
+            while len(self.queue) > 0:
+                models = self.queue.popleft()
+                try:
+                    with self.lock:
+                        for model in models:
+                            self.add_model(model)
+                except Exception:
+                    logger.exception('Indexing failed')
+
+    def add_model(self, model):
+        if isinstance(model, Track):
+            names = [model.name]
+            if model.album is not None:
+                names.append(model.album.name)
+                self.add_model(model.album)
+            for artist in model.artists:
+                names.append(artist.name)
+                self.add_model(artist)
+            self.add_item(Ref.TRACK, model, names)
+        elif isinstance(model, Album):
+            names = [model.name]
+            for artist in model.artists:
+                names.append(artist.name)
+            self.add_item(Ref.ALBUM, model, names)
+        elif isinstance(model, Artist):
+            self.add_item(Ref.ARTIST, model, [model.name])
+        elif isinstance(model, Ref) and model.type in (Ref.TRACK, Ref.ALBUM, Ref.ARTIST):
+            # Refs only carry a name, don't let them replace a full model
+            if (model.type, model.uri) not in self.items:
+                self.add_item(model.type, model, [model.name])
+
+    def add_item(self, kind, model, names):
+        if model.uri is None or model.name is None:
+            return
+        key = (kind, model.uri)
+        self.items[key] = model
+        for name in names:
+            for token in self.tokenize(name):
+                keys = self.tokens.get(token)
+                if keys is None:
+                    keys = set()
+                    self.tokens[token] = keys
+                    bisect.insort(self.sorted_tokens, token)
+                keys.add(key)
+
+    def find_prefix(self, prefix):
+        keys = set()
+        pos = bisect.bisect_left(self.sorted_tokens, prefix)
+        while pos < len(self.sorted_tokens) and self.sorted_tokens[pos].startswith(prefix):
+            keys |= self.tokens[self.sorted_tokens[pos]]
+            pos += 1
+        return keys
+
+    # Items of the given kind (one of Ref.TRACK, Ref.ALBUM, Ref.ARTIST) matching every word of query as a prefix
+    def search(self, query, kind):
+        words = self.tokenize(query)
+        if len(words) == 0:
+            return []
+        with self.lock:
+            keys = None
+            for word in words:
+                found = self.find_prefix(word)
+                if keys is None:
+                    keys = found
+                else:
+                    keys &= found
+                if len(keys) == 0:
+                    return []
+            results = [self.items[key] for key in keys if key[0] == kind]
+        results.sort(key=lambda model: model.name.casefold())
+        return results[:SearchIndex.max_results]
@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import pykka
+from mopidy.models import Ref
+
+logger = logging.getLogger(__name__)
+
+
+class SearchRequest:
+    def __init__(self, query, kind, callback, generation, delay):
+        self.query = query
+        self.kind = kind
+        self.callback = callback
+        self.generation = generation
+        self.start_time = time.monotonic() + delay
+
+
+class SearchWorker:
+    """
+    Runs library searches on a background thread.
+
+    Requests are debounced, a new request supersedes the pending one and the results
+    of superseded requests are dropped. Every URI scheme is searched separately and
+    its results are handed to the callback as soon as they arrive. Results are cached
+    by (query, kind) if every backend answered.
+    """
+
+    debounce = 0.4
+    cache_size = 32
+    # seconds to wait for all backends of a search. The core actor runs the searches one after
+    # another, so a slow backend delays the ones behind it and a limit per backend would add up.
+    search_timeout = 10
+
+    # kind -> (search field, SearchResult attribute)
+    fields = {
+        Ref.TRACK: ('any', 'tracks'),
+        Ref.ALBUM: ('album', 'albums'),
+        Ref.ARTIST: ('artist', 'artists'),
+    }
+
+    def __init__(self, core):
+        self.core = core
+        self.condition = threading.Condition()
+        self.pending = None
+        self.generation = 0
+        self.cache = OrderedDict()
+        self.worker = None
+        self.schemes = None
+        # scheme -> smoothed response time in seconds
+        self.latency = {}
+
+    def get_cached(self, query, kind):
+        with self.condition:
+            results = self.cache.get((query, kind))
+            if results is not None:
+                self.cache.move_to_end((query, kind))
+            return results
+
+    # callback(query, kind, scheme, results) is called from the worker thread once per scheme
+    def search(self, query, kind, callback, delay=None):
+        if delay is None:
+            delay = SearchWorker.debounce
+        with self.condition:
+            self.generation += 1
+            self.pending = SearchRequest(query, kind, callback, self.generation, delay)
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.run, name="Search", daemon=True)
+                self.worker.start()
+            self.condition.notify()
+
+    def cancel(self):
+        with self.condition:
+            self.generation += 1
+            self.pending = None
+            self.condition.notify()
+
+    def next_request(self):
+        with self.condition:
+            while True:
+                if self.pending is None:
+                    self.condition.wait()
+                    continue
+                remaining = self.pending.start_time - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+                request = self.pending
+                self.pending = None
+                return request
+
+    def get_schemes(self):
+        if self.schemes is None:
+            self.schemes = self.core.get_uri_schemes().get()
+        return self.schemes
+
+    def run(self):
+        while True:
+            request = self.next_request()
+            try:
+                results = self.run_search(request)
+            except Exception:
+                logger.exception(f'Search for "{request.query}" failed')
+                continue
+            if results is not None:
+                with self.condition:
+                    self.cache[(request.query, request.kind)] = results
+                    while len(self.cache) > SearchWorker.cache_size:
+                        self.cache.popitem(last=False)
+
+    def is_superseded(self, request):
+        with self.condition:
+            return request.generation != self.generation
+
+    # Returns scheme -> results in the order of get_uri_schemes(), None if the request was superseded
+    # or a backend failed, so incomplete results are not cached
+    def run_search(self, request):
+        field, attribute = SearchWorker.fields[request.kind]
+        search_query = {field: [request.query]}
+        logger.debug(f'{search_query}')
+        schemes = self.get_schemes()
+        # The core handles one call after another, so ask the backends that answered fastest so far first
+        futures = []
+        for scheme in sorted(schemes, key=lambda s: self.latency.get(s, 0)):
+            futures.append((scheme, self.core.library.search(search_query, uris=[scheme + ':'])))
+
+        results = {}
+        complete = True
+        start = time.monotonic()
+        deadline = start + SearchWorker.search_timeout
+        for scheme, future in futures:
+            found = []
+            try:
+                for backend in future.get(timeout=max(deadline - time.monotonic(), 0)) or []:
+                    found.extend(getattr(backend, attribute))
+            except pykka.Timeout:
+                logger.info(f'Search in "{scheme}" timed out')
+                complete = False
+            except Exception:
+                logger.exception(f'Search in "{scheme}" failed')
+                complete = False
+            now = time.monotonic()
+            self.latency[scheme] = (self.latency.get(scheme, now - start) + now - start) / 2
+            start = now
+            results[scheme] = found
+            if self.is_superseded(request):
+                logger.debug(f'dropping results of superseded search "{request.query}"')
+                return None
+            request.callback(request.query, request.kind, scheme, found)
+        if not complete:
+            return None
+        return {scheme: results[scheme] for scheme in schemes}
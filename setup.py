@@ -23,11 +23,12 @@ setup(
     zip_safe=False,
     include_package_data=True,
     install_requires=[
-        'setuptools',
         'Mopidy >= 3.2',
         'Pykka >= 3.0',
         'musicbrainzngs >= 0.7.1',
-        'pygame >= 2.1'
+        'pygame >= 2.1',
+        # the fonts are found with pkg_resources before Python 3.9
+        'setuptools; python_version < "3.9"',
     ],
     test_suite='nose.collector',
     tests_require=[
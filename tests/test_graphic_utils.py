@@ -0,0 +1,161 @@
+import os
+import unittest
+from unittest import mock
+
+import pygame
+
+from mopidy_touchscreen.graphic_utils import DynamicBackground, ListView, Progressbar, TextItem, TouchAndTextItem, \
+    get_selection_overlays
+from mopidy_touchscreen.scheduler import scheduler
+
+
+class PygameTestCase(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        # the tests move the clock of the UI loop, it is put back afterwards
+        for attribute, value in (('now', scheduler.now), ('frame_deadline', None), ('timers', [])):
+            patcher = mock.patch.object(scheduler, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        pygame.init()
+        pygame.display.set_mode((320, 240))
+        self.font = pygame.font.Font(None, 20)
+
+    def tearDown(self):
+        pygame.quit()
+
+
+class ListViewTest(PygameTestCase):
+
+    def setUp(self):
+        PygameTestCase.setUp(self)
+        self.list_view = ListView((0, 0), (320, 200), 25, self.font)
+        self.list_view.set_list([str(i) for i in range(10000)])
+
+    def test_scroll_to(self):
+        self.list_view.scroll_to(8000)
+        self.assertLessEqual(self.list_view.current_item, 8000)
+        self.assertLess(8000, self.list_view.current_item + self.list_view.max_rows)
+
+    def test_scroll_to_last_page(self):
+        self.list_view.scroll_to(9999)
+        self.assertEqual(self.list_view.current_item, 10000 - self.list_view.max_rows)
+
+    def test_set_selected_far_away(self):
+        self.list_view.set_selected(8000)
+        self.assertEqual(self.list_view.selected, 8000)
+        self.assertTrue(self.list_view.screen_objects.get_touch_object('8000').selected)
+
+    def test_selection_overlays_are_shared(self):
+        self.assertIs(get_selection_overlays((320, 20)), get_selection_overlays((320.0, 20)))
+        self.assertIsNot(get_selection_overlays((320, 20)), get_selection_overlays((100, 20)))
+
+    def test_widgets_have_no_instance_dict(self):
+        item = TouchAndTextItem(self.font, 'text', (10, 20), (100, -1))
+        self.assertFalse(hasattr(item, '__dict__'))
+        self.assertFalse(item.active)
+        self.assertEqual(item.rect_in_pos.topleft, (10, 20))
+
+    def test_scrolling_rows_are_capped(self):
+        self.list_view.set_list(['row %d is much too long to fit into the list view at all' % i for i in range(20)])
+        self.assertEqual(len(self.list_view.update_keys), ListView.max_scrolling)
+        self.list_view.set_selected(5)
+        self.assertEqual(self.list_view.update_keys[0], '5')
+        self.assertFalse(self.list_view.screen_objects.get_touch_object('10').update())
+
+
+class DynamicBackgroundTest(PygameTestCase):
+
+    def test_crossfade_keyframes(self):
+        background = DynamicBackground((320, 240))
+        background.set_crossfade(2, 4)
+        background.set_background_image(pygame.Surface((100, 100)))
+        scheduler.now = 100
+        redraws = 0
+        while background.is_fading():
+            if background.should_update():
+                background.update_background()
+                redraws += 1
+            scheduler.now += 0.1
+        self.assertEqual(redraws, 4)
+
+        background.set_crossfade(0, 4)
+        background.set_background_image(pygame.Surface((100, 100)))
+        background.update_background()
+        self.assertFalse(background.is_fading())
+
+    def test_resize_keeps_cover_aspect(self):
+        cover = pygame.Surface((200, 100))
+        cover.fill((200, 0, 0))
+        cover.fill((0, 0, 200), (100, 0, 100, 100))
+        background = DynamicBackground((320, 240))
+        background.set_crossfade(0, 1)
+        background.set_background_image(background.prepare_image(cover), background.shrink_cover(cover))
+        background.update_background()
+
+        # the same aspect ratio is only scaled
+        background.resize((160, 120))
+        self.assertEqual(background.surface.get_size(), (160, 120))
+
+        # a new one is prepared from the cover again, not stretched
+        background.resize((120, 240))
+        expected = DynamicBackground((120, 240)).prepare_image(background.shrink_cover(cover))
+        self.assertEqual(pygame.image.tobytes(background.surface, 'RGB'), pygame.image.tobytes(expected, 'RGB'))
+
+
+class TextItemTest(PygameTestCase):
+
+    def assert_renders_like(self, item, text):
+        expected = TextItem(self.font, text, item.pos, item.size)
+        surface = pygame.Surface((320, 40))
+        expected_surface = pygame.Surface((320, 40))
+        item.render(surface)
+        expected.render(expected_surface)
+        self.assertEqual(pygame.image.tobytes(surface, 'RGB'), pygame.image.tobytes(expected_surface, 'RGB'))
+
+    def test_text_edits(self):
+        item = TextItem(self.font, 'hello', (0, 0), (300, -1))
+        item.add_text(' world', False)
+        self.assert_renders_like(item, 'hello world')
+        box = item.box
+        item.remove_text(6, False)
+        self.assert_renders_like(item, 'hello')
+        self.assertIs(item.box, box)
+        self.assertEqual(item.size[0], 300)
+
+    def test_set_text_change_size(self):
+        item = TextItem(self.font, '00:00', (0, 0), None)
+        item.set_text('01:59', True)
+        self.assertEqual(item.size, (item.text_width, self.font.get_height()))
+
+    def test_marquee_wraps_around(self):
+        item = TextItem(self.font, 'a text that is much too long for the item', (0, 0), (100, -1))
+        period = item.text_width + item.scroll_white_gap
+        # the marquee follows the clock, however many frames were drawn in between
+        scheduler.now = item.marquee_start + (period - 50) / TextItem.scroll_speed
+        offset = int((scheduler.now - item.marquee_start) * TextItem.scroll_speed) % period
+        self.assertEqual(offset, period - 50)
+        surface = pygame.Surface((100, item.size[1]))
+        expected_surface = pygame.Surface((100, item.size[1]))
+        item.render(surface)
+        expected_surface.blit(item.box, (-offset, 0), area=(0, 0, item.text_width, item.size[1]))
+        expected_surface.blit(item.box, (period - offset, 0), area=(0, 0, item.text_width, item.size[1]))
+        self.assertEqual(pygame.image.tobytes(surface, 'RGB'), pygame.image.tobytes(expected_surface, 'RGB'))
+
+
+class ProgressbarTest(PygameTestCase):
+
+    def test_progressbar_updates(self):
+        progress = Progressbar(self.font, '', (10, 10), (200, 30), 1000, False)
+        for value, text in ((100, '00:01/03:00'), (500, '00:02/03:00'), (300, '00:03/03:00')):
+            progress.set_value(value)
+            progress.set_text(text)
+        expected = Progressbar(self.font, '', (10, 10), (200, 30), 1000, False)
+        expected.set_value(300)
+        expected.set_text('00:03/03:00')
+        self.assertEqual(pygame.image.tobytes(progress.surface, 'RGBA'), pygame.image.tobytes(expected.surface, 'RGBA'))
+
+        progress.dirty_rects = []
+        progress.set_text('00:04/03:00')
+        self.assertEqual(len(progress.dirty_rects), 1)
@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import pygame
+
+from mopidy_touchscreen.output import FramebufferOutput
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'needs NumPy')
+class FramebufferOutputTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        pygame.init()
+        pygame.display.set_mode((40, 30))
+        # a framebuffer file with rows longer than the visible width
+        self.stride = 50 * 2
+        handle, self.path = tempfile.mkstemp()
+        os.write(handle, bytes(self.stride * 30))
+        os.close(handle)
+        self.output = FramebufferOutput(self.path, (40, 30), self.stride)
+
+    def tearDown(self):
+        self.output.close()
+        os.remove(self.path)
+        pygame.quit()
+
+    def pixel(self, x, y):
+        with open(self.path, 'rb') as f:
+            f.seek(y * self.stride + x * 2)
+            return int.from_bytes(f.read(2), sys.byteorder)
+
+    def test_only_rects_are_written(self):
+        frame = pygame.Surface((40, 30)).convert()
+        frame.fill((255, 0, 0))
+        frame.fill((0, 255, 0), (10, 5, 4, 3))
+        self.output.present(frame, [pygame.Rect(10, 5, 4, 3), pygame.Rect(38, 28, 10, 10)])
+        self.assertEqual(self.pixel(10, 5), 0x07e0)
+        self.assertEqual(self.pixel(13, 7), 0x07e0)
+        self.assertEqual(self.pixel(14, 7), 0)
+        self.assertEqual(self.pixel(39, 29), 0xf800)
+        self.assertEqual(self.pixel(0, 0), 0)
+
+    def test_full_frame(self):
+        frame = pygame.Surface((40, 30)).convert()
+        frame.fill((0, 0, 255))
+        self.output.present(frame, None)
+        self.assertEqual(self.pixel(0, 0), 0x001f)
+        self.assertEqual(self.pixel(39, 29), 0x001f)
+        # outside the visible width
+        self.assertEqual(self.pixel(40, 0), 0)
+
+    def test_rgb565_frame_is_copied(self):
+        frame = pygame.Surface((40, 30), 0, 16)
+        frame.fill((255, 255, 0))
+        self.output.present(frame, [pygame.Rect(0, 0, 5, 5)])
+        self.assertEqual(self.pixel(4, 4), 0xffe0)
+        self.assertEqual(self.pixel(5, 5), 0)
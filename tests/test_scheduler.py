@@ -0,0 +1,43 @@
+import os
+import time
+import unittest
+
+import pygame
+
+from mopidy_touchscreen.scheduler import Scheduler
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        pygame.init()
+        pygame.display.set_mode((320, 240))
+        pygame.event.get()
+        self.scheduler = Scheduler()
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_timers(self):
+        called = []
+        self.scheduler.call_later(0, lambda: called.append('due'))
+        self.scheduler.call_later(60, lambda: called.append('later'))
+        self.scheduler.call_later(0, lambda: called.append('cancelled')).cancel()
+        self.scheduler.tick()
+        self.assertEqual(called, ['due'])
+
+    def test_next_deadline(self):
+        self.scheduler.tick()
+        self.assertEqual(self.scheduler.next_deadline(), self.scheduler.now + Scheduler.max_sleep)
+        self.scheduler.call_later(0.5, lambda: None)
+        self.assertEqual(self.scheduler.next_deadline(), self.scheduler.now + 0.5)
+        self.scheduler.request_frame()
+        self.assertEqual(self.scheduler.next_deadline(), self.scheduler.now + 1 / Scheduler.frame_rate)
+
+    def test_wake(self):
+        self.scheduler.request_frame_at(self.scheduler.now + 10)
+        start = time.monotonic()
+        Scheduler.wake()
+        self.assertEqual(self.scheduler.wait(), [])
+        self.assertLess(time.monotonic() - start, 1)
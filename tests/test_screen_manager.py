@@ -0,0 +1,242 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import pygame
+
+try:
+    import mopidy.core
+    from mopidy.models import Ref
+    from mopidy_touchscreen import graphic_utils
+    from mopidy_touchscreen.output import DisplayOutput
+    from mopidy_touchscreen.scheduler import scheduler
+    from mopidy_touchscreen.screen_manager import ScreenManager, Screen, show_splash
+    from mopidy_touchscreen.screens import BaseScreen
+except ImportError:
+    # mopidy.core needs GStreamer
+    mopidy = None
+
+
+def future(value):
+    result = mock.Mock()
+    result.get.return_value = value
+    return result
+
+
+def fake_core():
+    core = mock.Mock()
+    core.playback.get_current_track.return_value = future(None)
+    core.playback.get_current_tl_track.return_value = future(None)
+    core.playback.get_state.return_value = future(mopidy.core.PlaybackState.STOPPED)
+    core.mixer.get_mute.return_value = future(False)
+    core.mixer.get_volume.return_value = future(50)
+    core.tracklist.get_tl_tracks.return_value = future([])
+    for option in ('get_random', 'get_repeat', 'get_single', 'get_consume'):
+        getattr(core.tracklist, option).return_value = future(False)
+    core.library.browse.return_value = future([])
+    core.playlists.as_list.return_value = future([])
+    core.get_uri_schemes.return_value = future([])
+    return core
+
+
+@unittest.skipIf(mopidy is None, 'needs Mopidy with GStreamer')
+class ScreenManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        # timers and frame requests stay with this test
+        for attribute, value in (('now', scheduler.now), ('frame_deadline', None), ('timers', [])):
+            patcher = mock.patch.object(scheduler, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        pygame.init()
+        pygame.display.set_mode((320, 240))
+        self.output = DisplayOutput()
+        self.manager = ScreenManager((320, 240), fake_core(), '/nonexistent', 8, Screen.Library)
+        # builds the other screens
+        for screen in Screen:
+            self.manager.update(self.output)
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_restored_frame_is_used_once(self):
+        self.manager.change_screen(Screen.Menu)
+        self.manager.update(self.output)
+        self.manager.change_screen(Screen.Library)
+        self.manager.update(self.output)
+        self.assertNotIn(Screen.Library, self.manager.frame_cache)
+
+        # partial updates don't change the key, a later full frame has to be drawn again
+        with mock.patch.object(self.manager, 'render', wraps=self.manager.render) as render:
+            self.manager.update_type = BaseScreen.update_all
+            self.manager.update(self.output)
+            render.assert_called_once()
+
+    def test_restored_frame_requests_next_frame(self):
+        self.manager.change_screen(Screen.Player)
+        self.manager.update(self.output)
+        self.manager.change_screen(Screen.Menu)
+        self.manager.update(self.output)
+        scheduler.frame_deadline = None
+        self.manager.change_screen(Screen.Player)
+        with mock.patch.object(self.manager, 'render') as render:
+            self.manager.update(self.output)
+            render.assert_not_called()
+        self.assertIsNotNone(scheduler.frame_deadline)
+
+    def wait_for_ui_calls(self, count):
+        deadline = time.monotonic() + 5
+        while len(self.manager.ui_calls) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.manager.process_ui_calls()
+
+    def test_playlist_load_survives_other_changes(self):
+        playlists = self.manager.screens[Screen.Playlists]
+        release = threading.Event()
+
+        def get_items(uri):
+            release.wait(5)
+            return future([Ref.track(uri='local:track:1', name='Teardrop')])
+        self.manager.core.playlists.get_items.side_effect = get_items
+
+        playlists.playlist_selected(Ref.playlist(uri='m3u:a', name='A'))
+        playlists.playlist_changed(Ref.playlist(uri='m3u:b', name='B'))
+        release.set()
+        # the items of A and the list of playlists
+        self.wait_for_ui_calls(2)
+        self.assertEqual(playlists.playlist_tracks_strings, ['../', 'Teardrop'])
+
+    def test_playlist_load_failure_is_shown(self):
+        playlists = self.manager.screens[Screen.Playlists]
+        self.manager.core.playlists.get_items.side_effect = RuntimeError('backend gone')
+        with self.assertLogs('mopidy_touchscreen.screens', 'ERROR'):
+            playlists.playlist_selected(Ref.playlist(uri='m3u:a', name='A'))
+            self.wait_for_ui_calls(1)
+        self.assertEqual(playlists.playlist_tracks_strings[1], 'Loading failed, tap to retry')
+
+    def test_cover_is_handed_to_ui_thread(self):
+        player = self.manager.screens[Screen.Player]
+        player.track = mock.Mock()
+        cover = pygame.Surface((60, 60))
+        cover.fill((40, 90, 160))
+        with tempfile.TemporaryDirectory() as folder:
+            pygame.image.save(cover, os.path.join(folder, 'cover.bmp'))
+            with mock.patch.object(player, 'get_cover_folder', return_value=folder + '/'), \
+                    mock.patch.object(player, 'get_image_file_name', return_value='cover.bmp'):
+                player.load_image()
+        self.assertIsNone(player.image)
+        self.assertFalse(player.background.image_loaded)
+        self.manager.process_ui_calls()
+        self.assertIsNotNone(player.image)
+        self.assertTrue(player.background.is_fading())
+
+    def test_cover_of_previous_track_is_dropped(self):
+        player = self.manager.screens[Screen.Player]
+        player.track = mock.Mock()
+        player.set_cover(mock.Mock(), pygame.Surface((60, 60)), pygame.Surface((320, 240)))
+        self.assertIsNone(player.image)
+        self.assertFalse(player.background.image_loaded)
+
+    def test_splash_is_saved_after_screen_changes_only(self):
+        self.manager.splash_changed = False
+        self.manager.update_type = BaseScreen.update_partial
+        self.manager.update(self.output)
+        self.assertFalse(self.manager.splash_changed)
+        self.manager.change_screen(Screen.Menu)
+        self.assertTrue(self.manager.splash_changed)
+
+    def test_splash_is_written_by_worker(self):
+        with tempfile.TemporaryDirectory() as folder:
+            self.manager.cache = folder
+            self.manager.save_splash()
+            self.manager.splash_thread.join(5)
+            image = pygame.image.load(os.path.join(folder, 'splash.bmp'))
+            self.assertEqual(image.get_size(), (320, 240))
+
+    def test_splash_is_shown_on_output(self):
+        output = mock.Mock()
+        with tempfile.TemporaryDirectory() as folder:
+            self.manager.cache = folder
+            self.manager.save_splash(wait=True)
+            show_splash(output, folder, (480, 320))
+            output.present.assert_not_called()
+            show_splash(output, folder, (320, 240))
+        frame, rects = output.present.call_args[0]
+        self.assertEqual(frame.get_size(), (320, 240))
+        self.assertIsNone(rects)
+
+    def test_partial_rects_are_scaled_to_display(self):
+        self.manager.set_render_scale(50)
+        self.assertEqual(self.manager.size, (160, 120))
+        self.manager.back_buffer.fill((255, 0, 0), (10, 10, 5, 5))
+        frame, rects = self.manager.scale_frame(BaseScreen.update_partial,
+                                                [pygame.Rect(10, 10, 5, 5), pygame.Rect(150, 110, 20, 20)])
+        self.assertEqual(frame.get_size(), (320, 240))
+        # the second rect is clipped to the frame
+        self.assertEqual(rects, [pygame.Rect(20, 20, 10, 10), pygame.Rect(300, 220, 20, 20)])
+        self.assertEqual(frame.get_at((29, 29))[:3], (255, 0, 0))
+
+    def test_touch_positions_are_scaled(self):
+        self.manager.set_render_scale(50)
+        with mock.patch.object(self.manager.input_manager, 'event', return_value=None) as event:
+            self.manager.event(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(300, 200), button=1))
+        self.assertEqual(event.call_args[0][0].pos, (150, 100))
+
+    def test_render_scale_follows_full_frames(self):
+        self.manager.set_render_scale(0)
+        budget = 1 / scheduler.frame_rate
+        self.manager.full_frames = self.manager.render_scale_frames
+        self.manager.frame_time = budget
+        scheduler.now += self.manager.render_scale_interval
+        self.manager.adjust_render_scale()
+        self.assertEqual(self.manager.render_scale, 75)
+        self.assertEqual(self.manager.size, (240, 180))
+
+        # without full frames at the new scale it is kept
+        scheduler.now += self.manager.render_scale_interval
+        self.manager.adjust_render_scale()
+        self.assertEqual(self.manager.render_scale, 75)
+
+        # fast, but not fast enough for the larger scale
+        self.manager.full_frames = self.manager.render_scale_frames
+        self.manager.frame_time = budget * 0.3
+        scheduler.now += self.manager.render_scale_interval
+        self.manager.adjust_render_scale()
+        self.assertEqual(self.manager.render_scale, 75)
+
+        self.manager.frame_time = budget * 0.2
+        scheduler.now += self.manager.render_scale_interval
+        self.manager.adjust_render_scale()
+        self.assertEqual(self.manager.render_scale, 100)
+
+    def test_player_and_background_survive_scale_change(self):
+        player = self.manager.screens[Screen.Player]
+        background = self.manager.background
+        self.manager.set_render_scale(50)
+        self.assertIs(self.manager.screens[Screen.Player], player)
+        self.assertIs(self.manager.background, background)
+        self.assertEqual(background.surface.get_size(), (160, 120))
+        self.assertEqual(player.size, self.manager.screen_size)
+
+    def test_keyboard_layouts_follow_surface_depth(self):
+        graphic_utils.set_surface_depth(16)
+        self.addCleanup(graphic_utils.set_surface_depth, 0)
+        self.manager.open_keyboard(mock.Mock())
+        for surface in self.manager.keyboard.layout_surfaces:
+            self.assertEqual(surface.get_bitsize(), 16)
+
+    def test_resize_to_same_size_presents_full_frame(self):
+        for scale in (100, 50):
+            self.manager.set_render_scale(scale)
+            self.manager.update(self.output)
+            self.manager.update(self.output)
+            output = mock.Mock()
+            self.manager.resize((320, 240))
+            self.manager.update(output)
+            frame, rects = output.present.call_args[0]
+            self.assertEqual(frame.get_size(), (320, 240))
+            self.assertIsNone(rects)
@@ -0,0 +1,40 @@
+import time
+import unittest
+
+from mopidy.models import Album, Artist, Ref, Track
+
+from mopidy_touchscreen.search_index import SearchIndex
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex()
+        self.track = Track(uri='local:track:1', name='Wish You Were Here',
+                           album=Album(uri='local:album:1', name='Wish You Were Here'),
+                           artists=[Artist(uri='local:artist:1', name='Pink Floyd')])
+        self.index.add_model(self.track)
+        self.index.add_model(Ref.track(uri='local:track:2', name='Shine On You Crazy Diamond'))
+
+    def test_prefix_search(self):
+        self.assertEqual(self.index.search('wis', Ref.TRACK), [self.track])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.index.search('you pink', Ref.TRACK), [self.track])
+        self.assertEqual(len(self.index.search('you', Ref.TRACK)), 2)
+        self.assertEqual(self.index.search('crazy pink', Ref.TRACK), [])
+
+    def test_search_by_kind(self):
+        self.assertEqual(self.index.search('pink', Ref.ARTIST)[0].name, 'Pink Floyd')
+        self.assertEqual(self.index.search('were', Ref.ALBUM)[0].uri, 'local:album:1')
+
+    def test_ref_does_not_replace_model(self):
+        self.index.add_model(Ref.track(uri='local:track:1', name='Wish You Were Here'))
+        self.assertIsInstance(self.index.search('wish', Ref.TRACK)[0], Track)
+
+    def test_add_in_background(self):
+        self.index.add([Artist(uri='local:artist:2', name='Portishead')])
+        deadline = time.monotonic() + 5
+        while len(self.index.search('portis', Ref.ARTIST)) == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.index.search('portis', Ref.ARTIST)[0].name, 'Portishead')
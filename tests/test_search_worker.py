@@ -0,0 +1,81 @@
+import threading
+import unittest
+from unittest import mock
+
+import pykka
+from mopidy.models import Ref, SearchResult, Track
+
+from mopidy_touchscreen.search_worker import SearchRequest, SearchWorker
+
+
+class SearchWorkerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.core = mock.Mock()
+        self.core.get_uri_schemes.return_value.get.return_value = ['local', 'slow']
+        self.track = Track(uri='local:track:1', name='Teardrop')
+        self.core.library.search.side_effect = self.search
+        self.worker = SearchWorker(self.core)
+        self.done = threading.Event()
+        self.results = []
+
+    def search(self, query, uris=None):
+        future = mock.Mock()
+        if uris == ['slow:']:
+            future.get.side_effect = pykka.Timeout
+        else:
+            future.get.return_value = [SearchResult(uri='local:search', tracks=[self.track])]
+        return future
+
+    def callback(self, query, kind, scheme, results):
+        self.results.append((query, kind, scheme, results))
+        if len(self.results) == 2:
+            self.done.set()
+
+    def test_superseded_requests_are_not_run(self):
+        self.worker.search('tea', Ref.TRACK, self.callback, delay=0.2)
+        self.worker.search('tear', Ref.TRACK, self.callback, delay=0.2)
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.core.library.search.call_count, 2)
+        self.core.library.search.assert_any_call({'any': ['tear']}, uris=['local:'])
+
+    def test_results_per_backend(self):
+        self.worker.search('tear', Ref.TRACK, self.callback, delay=0)
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.results, [('tear', Ref.TRACK, 'local', [self.track]),
+                                        ('tear', Ref.TRACK, 'slow', [])])
+
+    def wait_for_cache(self, query, kind):
+        for i in range(100):
+            if self.worker.get_cached(query, kind) is not None:
+                break
+            threading.Event().wait(0.01)
+        return self.worker.get_cached(query, kind)
+
+    def test_results_are_cached(self):
+        self.core.get_uri_schemes.return_value.get.return_value = ['local']
+        self.worker.search('tear', Ref.TRACK, self.callback, delay=0)
+        self.assertEqual(self.wait_for_cache('tear', Ref.TRACK), {'local': [self.track]})
+        self.assertIsNone(self.worker.get_cached('tear', Ref.ALBUM))
+
+    def test_incomplete_results_are_not_cached(self):
+        request = SearchRequest('tear', Ref.TRACK, self.callback, self.worker.generation, 0)
+        self.assertIsNone(self.worker.run_search(request))
+        self.core.get_uri_schemes.return_value.get.return_value = ['local']
+        self.worker.schemes = None
+        self.assertEqual(self.worker.run_search(request), {'local': [self.track]})
+
+    def test_one_deadline_for_all_backends(self):
+        timeouts = []
+
+        def get(timeout):
+            timeouts.append(timeout)
+            threading.Event().wait(timeout)
+            raise pykka.Timeout
+        self.core.library.search.side_effect = None
+        self.core.library.search.return_value.get.side_effect = get
+        request = SearchRequest('tear', Ref.TRACK, self.callback, self.worker.generation, 0)
+        with mock.patch.object(SearchWorker, 'search_timeout', 0.1):
+            self.worker.run_search(request)
+        self.assertEqual(len(timeouts), 2)
+        self.assertEqual(timeouts[1], 0)